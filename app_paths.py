@@ -0,0 +1,48 @@
+"""
+Application Paths
+Per-user locations for caches and application data
+"""
+
+import hashlib
+import os
+import sys
+
+APP_NAME = "VideoEditor"
+
+def get_cache_dir(*parts):
+    """Get a per-user cache directory, creating it if needed"""
+    base = os.environ.get('VIDEOEDITOR_CACHE_DIR')
+    if not base:
+        if sys.platform == 'win32':
+            root = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+        elif sys.platform == 'darwin':
+            root = os.path.expanduser('~/Library/Caches')
+        else:
+            root = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+        base = os.path.join(root, APP_NAME)
+    
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_data_dir(*parts):
+    """Get a per-user directory for data that must not be cleared with the cache"""
+    base = os.environ.get('VIDEOEDITOR_DATA_DIR')
+    if not base:
+        if sys.platform == 'win32':
+            root = os.environ.get('APPDATA', os.path.expanduser('~'))
+        elif sys.platform == 'darwin':
+            root = os.path.expanduser('~/Library/Application Support')
+        else:
+            root = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+        base = os.path.join(root, APP_NAME)
+    
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def file_cache_key(filepath):
+    """Cache key for a media file; changes when the file is modified"""
+    stat = os.stat(filepath)
+    signature = f"{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(signature.encode('utf-8')).hexdigest()
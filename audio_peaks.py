@@ -0,0 +1,199 @@
+"""
+Audio Peaks
+Builds multi-resolution min/max peak files for drawing waveforms
+"""
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+import os
+import queue
+import threading
+import numpy as np
+import ffmpeg
+from app_paths import get_cache_dir, file_cache_key
+
+PEAKS_VERSION = 1
+BASE_BLOCK = 256  # Samples per peak at the finest level
+CHUNK_SAMPLES = BASE_BLOCK * 4096  # Samples read from ffmpeg at a time
+
+class PeakPyramid:
+    """Min/max peaks of a mono mix; level n covers BASE_BLOCK * 2**n samples per peak"""
+    
+    def __init__(self, sample_rate, levels):
+        self.sample_rate = sample_rate
+        self.levels = levels  # List of (count, 2) float32 arrays of min, max
+    
+    @classmethod
+    def from_base(cls, sample_rate, base):
+        """Build the coarser levels by merging pairs of peaks"""
+        levels = [base]
+        while len(levels[-1]) > 1:
+            level = levels[-1]
+            if len(level) % 2:
+                level = np.concatenate([level, level[-1:]])
+            pairs = level.reshape(-1, 2, 2)
+            levels.append(np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1))
+        return cls(sample_rate, levels)
+    
+    def get_level(self, samples_per_pixel):
+        """Coarsest level that still has at least one peak per pixel"""
+        ratio = samples_per_pixel / float(BASE_BLOCK)
+        index = int(np.floor(np.log2(ratio))) if ratio >= 1 else 0
+        return min(index, len(self.levels) - 1)
+    
+    def get_columns(self, start, pixels_per_second, width):
+        """Get (min, max) of each of width pixel columns starting at source time start"""
+        samples_per_pixel = self.sample_rate / float(pixels_per_second)
+        index = self.get_level(samples_per_pixel)
+        level = self.levels[index]
+        block = BASE_BLOCK * 2 ** index
+        
+        # Peak index at the edges of every column
+        count = len(level)
+        edges = start * self.sample_rate / block + np.arange(width + 1) * (samples_per_pixel / block)
+        edges = np.clip(edges.astype(np.int64), 0, count)
+        columns = int(np.count_nonzero(edges[:-1] < count))  # Columns past the end stay empty
+        lo = edges[:columns]
+        
+        mins = np.zeros(width, np.float32)
+        maxs = np.zeros(width, np.float32)
+        if columns == 0:
+            return mins, maxs
+        if samples_per_pixel >= block:
+            # Every column covers at least one whole peak
+            end = edges[columns]
+            mins[:columns] = np.minimum.reduceat(level[:end, 0], lo)
+            maxs[:columns] = np.maximum.reduceat(level[:end, 1], lo)
+        else:
+            # Zoomed in past the finest level, neighbouring columns share a peak
+            mins[:columns] = level[lo, 0]
+            maxs[:columns] = level[lo, 1]
+        return mins, maxs
+    
+    def save(self, path):
+        """Write the pyramid to an npz file"""
+        temp_path = path + '.tmp.npz'
+        levels = {f'level_{i}': level for i, level in enumerate(self.levels)}
+        np.savez(temp_path, version=PEAKS_VERSION, sample_rate=self.sample_rate, **levels)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """Read a pyramid from an npz file, or None if missing or stale"""
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != PEAKS_VERSION:
+                    return None
+                count = len([name for name in data.files if name.startswith('level_')])
+                levels = [data[f'level_{i}'] for i in range(count)]
+                return cls(int(data['sample_rate']), levels)
+        except (OSError, ValueError, KeyError):
+            return None
+
+def analyze_audio(filepath, sample_rate):
+    """Decode the audio once as a mono mix and reduce it to finest-level peaks"""
+    process = (
+        ffmpeg
+        .input(filepath)
+        .audio
+        .output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=sample_rate)
+        .run_async(pipe_stdout=True, quiet=True)
+    )
+    peaks = []
+    carry = np.zeros(0, np.float32)
+    try:
+        while True:
+            data = process.stdout.read(CHUNK_SAMPLES * 4)
+            if not data:
+                break
+            samples = np.concatenate([carry, np.frombuffer(data, np.float32)])
+            usable = len(samples) - len(samples) % BASE_BLOCK
+            blocks = samples[:usable].reshape(-1, BASE_BLOCK)
+            peaks.append(np.stack([blocks.min(axis=1), blocks.max(axis=1)], axis=1))
+            carry = samples[usable:]
+    finally:
+        process.stdout.close()
+        process.wait()
+    if len(carry):
+        peaks.append(np.array([[carry.min(), carry.max()]], np.float32))
+    if not peaks:
+        raise IOError(f"No audio decoded from {filepath}")
+    return np.concatenate(peaks).astype(np.float32)
+
+class PeaksWorker(QThread):
+    """Loads or analyzes peak files one file at a time"""
+    
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.requests = queue.Queue()
+    
+    def run(self):
+        """Process requests until a None is queued"""
+        while True:
+            filepath = self.requests.get()
+            if filepath is None:
+                return
+            self.cache.build(filepath)
+
+class AudioPeaksCache(QObject):
+    """Peak pyramids for the timeline; audio is never decoded on the paint path"""
+    
+    peaks_ready = pyqtSignal(str)
+    
+    def __init__(self):
+        super().__init__()
+        self.pyramids = {}  # filepath -> PeakPyramid, or None while pending, failed or silent
+        self.lock = threading.Lock()
+        self.worker = None
+    
+    def get(self, filepath):
+        """Get the peaks of a file, queueing it if they aren't loaded yet"""
+        with self.lock:
+            if filepath in self.pyramids:
+                return self.pyramids[filepath]
+            self.pyramids[filepath] = None
+        
+        if self.worker is None:
+            self.worker = PeaksWorker(self)
+            self.worker.start()
+        self.worker.requests.put(filepath)
+        return None
+    
+    def get_cache_path(self, filepath):
+        """Location of the peak file for a source"""
+        return os.path.join(get_cache_dir('peaks'), file_cache_key(filepath) + '.npz')
+    
+    def build(self, filepath):
+        """Load a peak file or analyze the source; runs on the worker thread"""
+        from media_probe import probe
+        try:
+            info = probe(filepath)
+            if not info.has_audio:
+                return
+            cache_path = self.get_cache_path(filepath)
+            pyramid = PeakPyramid.load(cache_path)
+            if pyramid is None:
+                sample_rate = info.audio_sample_rate or 44100
+                pyramid = PeakPyramid.from_base(sample_rate, analyze_audio(filepath, sample_rate))
+                pyramid.save(cache_path)
+        except Exception as e:
+            print(f"Error analyzing audio: {e}")
+            return
+        
+        with self.lock:
+            self.pyramids[filepath] = pyramid
+        self.peaks_ready.emit(filepath)
+    
+    def stop(self):
+        """Stop the worker thread, dropping requests it hasn't started"""
+        if self.worker:
+            with self.lock:
+                self.pyramids = {path: p for path, p in self.pyramids.items() if p}
+            try:
+                while True:
+                    self.worker.requests.get_nowait()
+            except queue.Empty:
+                pass
+            self.worker.requests.put(None)
+            self.worker.wait()
+            self.worker = None
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Benchmarks
+Measures frame throughput of the rendering code paths
+"""
+
+import argparse
+import itertools
+import sys
+import time
+import numpy as np
+
+def color_correction_reference(frame, brightness=0, contrast=1.0, saturation=1.0):
+    """Original float32 per-pixel color correction, kept for comparison"""
+    frame = frame.astype(np.float32) / 255.0
+    frame = frame + brightness / 100.0
+    frame = np.clip(frame, 0, 1)
+    frame = (frame - 0.5) * contrast + 0.5
+    frame = np.clip(frame, 0, 1)
+    gray = np.dot(frame[...,:3], [0.299, 0.587, 0.114])
+    gray = np.stack([gray, gray, gray], axis=2)
+    frame = gray + (frame - gray) * saturation
+    frame = np.clip(frame, 0, 1)
+    return (frame * 255).astype(np.uint8)
+
+def random_frame(width, height, seed=0):
+    """Create a random RGB frame"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+def measure_fps(func, frame, frames):
+    """Run func over the same frame and return frames per second"""
+    func(frame)  # Warm up
+    start = time.perf_counter()
+    for _ in range(frames):
+        func(frame)
+    return frames / (time.perf_counter() - start)
+
+def bench_color(args):
+    """Compare the lookup-table color correction with the float version"""
+    from effects import compile_color_correction
+    
+    # Accuracy over a grid of slider values
+    sample = random_frame(640, 360)
+    worst = 0
+    for brightness, contrast, saturation in itertools.product(
+            [-100, -35, 0, 20, 100], [0.0, 0.5, 1.0, 1.4, 2.0], [0.0, 0.5, 1.0, 1.3, 2.0]):
+        expected = color_correction_reference(sample, brightness, contrast, saturation)
+        actual = compile_color_correction(brightness, contrast, saturation)(sample)
+        diff = np.abs(expected.astype(np.int16) - actual.astype(np.int16)).max()
+        worst = max(worst, int(diff))
+    print(f"Max difference from reference: {worst}")
+    
+    frame = random_frame(args.width, args.height)
+    params = (args.brightness, args.contrast, args.saturation)
+    correction = compile_color_correction(*params)
+    before = measure_fps(lambda f: color_correction_reference(f, *params), frame, args.frames)
+    after = measure_fps(correction, frame, args.frames)
+    print(f"Color correction at {args.width}x{args.height}:")
+    print(f"  float32:      {before:8.2f} fps")
+    print(f"  lookup table: {after:8.2f} fps ({after / before:.1f}x)")
+    return 0 if worst <= 1 else 1
+
+def bench_graph(args):
+    """Compare one callback per effect with the fused effect kernel"""
+    from effect_graph import EffectGraph
+    
+    graph = EffectGraph()
+    graph.color_correction(args.brightness, args.contrast, args.saturation)
+    graph.fadein(1.0).fadeout(1.0)
+    if args.effects > 3:
+        graph.sepia()
+    if args.effects > 4:
+        graph.invert()
+    
+    # Unfused: every node is its own kernel with its own output array
+    chain = []
+    for node in graph.nodes:
+        single = EffectGraph().add(node)
+        chain.append(single.compile(args.duration))
+    
+    fused = graph.compile(args.duration)
+    print("Fused plan:")
+    for line in fused.describe():
+        print(f"  {line}")
+    
+    frame = random_frame(args.width, args.height)
+    t = 0.5  # Inside the fade in, so every node does work
+    unfused_fps = measure_fps(lambda f: run_chain(chain, f, t), frame, args.frames)
+    fused_fps = measure_fps(lambda f: fused(f, t), frame, args.frames)
+    print(f"{len(graph)} effects at {args.width}x{args.height}:")
+    print(f"  one callback per effect: {unfused_fps:8.2f} fps")
+    print(f"  fused kernel:            {fused_fps:8.2f} fps ({fused_fps / unfused_fps:.1f}x)")
+    return 0
+
+def bench_filters(args):
+    """Time the spatial filters, and scipy's gaussian_filter when it is installed"""
+    from spatial_filters import gaussian_blur, box_blur, unsharp_mask
+    
+    print(f"Filters at {args.width}x{args.height}:")
+    frame = random_frame(args.width, args.height)
+    for name, func in (("gaussian sigma 5", lambda f: gaussian_blur(f, 5.0)),
+                       ("gaussian sigma 30", lambda f: gaussian_blur(f, 30.0)),
+                       ("box radius 5", lambda f: box_blur(f, 5)),
+                       ("unsharp mask", lambda f: unsharp_mask(f, 1.0, 1.0))):
+        print(f"  {name:18s} {measure_fps(func, frame, args.frames):8.2f} fps")
+    try:
+        from scipy import ndimage
+    except ImportError:
+        print("  scipy is not installed, skipping the old gaussian_filter path")
+    else:
+        old = measure_fps(lambda f: ndimage.gaussian_filter(f, sigma=5.0), frame, max(1, args.frames // 10))
+        print(f"  {'scipy sigma 5':18s} {old:8.2f} fps")
+    return 0
+
+def bench_tiles(args):
+    """Compare a kernel on the whole frame with the same kernel run in strips"""
+    from effect_graph import EffectGraph, FusedKernel
+    from tiled_executor import TiledExecutor
+    
+    graph = EffectGraph()
+    if args.effect == 'color':
+        graph.color_correction(args.brightness, args.contrast, args.saturation)
+    elif args.effect == 'sepia':
+        graph.sepia()
+    elif args.effect == 'black_white':
+        graph.black_white()
+    elif args.effect == 'blur':
+        graph.blur(args.amount)
+    else:
+        graph.sharpen(args.amount)
+    
+    executor = TiledExecutor(args.workers)
+    single = graph.compile(args.duration, tiled=False)
+    tiled = FusedKernel(graph.nodes, args.duration, executor)
+    frame = random_frame(args.width, args.height)
+    same = np.array_equal(single(frame, 0.5), tiled(frame, 0.5))
+    
+    single_fps = measure_fps(lambda f: single(f, 0.5), frame, args.frames)
+    tiled_fps = measure_fps(lambda f: tiled(f, 0.5), frame, args.frames)
+    executor.shutdown()
+    strips = len(executor.get_strips(args.height, args.width))
+    print(f"{args.effect} at {args.width}x{args.height}, {strips} strips, halo {tiled.halo}:")
+    print(f"  whole frame: {single_fps:8.2f} fps")
+    print(f"  strips:      {tiled_fps:8.2f} fps ({tiled_fps / single_fps:.1f}x)")
+    print(f"Bit-identical: {'yes' if same else 'no'}")
+    return 0 if same else 1
+
+def bench_export(args):
+    """Compare the moviepy and raw pipe encode backends on one project"""
+    import os
+    import tempfile
+    import ffmpeg
+    from render import load_clips
+    from export_manager import ExportManager, BACKENDS
+    
+    workdir = tempfile.mkdtemp(prefix='bench_export_')
+    results = {}
+    for backend in BACKENDS:
+        clips = load_clips(args.project)
+        output_path = os.path.join(workdir, f'{backend}.mp4')
+        try:
+            results[backend] = ExportManager().export(clips, output_path, quality=args.quality,
+                                                      preset=args.preset, backend=backend)
+        finally:
+            for clip in clips:
+                clip.close()
+    
+    # Same frames and encoder settings, so the decoded video should match
+    digests = {}
+    for backend in BACKENDS:
+        out, _ = (
+            ffmpeg.input(os.path.join(workdir, f'{backend}.mp4')).video
+            .output('-', format='md5').run(capture_stdout=True, quiet=True)
+        )
+        digests[backend] = out.strip()
+        os.remove(os.path.join(workdir, f'{backend}.mp4'))
+    os.rmdir(workdir)
+    
+    base = results[BACKENDS[0]]
+    print(f"Export of {os.path.basename(args.project)} at {args.quality} quality:")
+    for backend in BACKENDS:
+        progress = results[backend]
+        print(f"  {backend:8s} {progress.fps:8.2f} fps {progress.elapsed:7.2f}s "
+              f"({progress.fps / base.fps:.2f}x)  {progress.describe_stages()}")
+    same = len(set(digests.values())) == 1
+    print(f"Decoded video identical: {'yes' if same else 'no'}")
+    return 0 if same else 1
+
+def run_chain(chain, frame, t):
+    """Run kernels one after another"""
+    for kernel in chain:
+        frame = kernel(frame, t)
+    return frame
+
+def main(argv=None):
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description="Video editor benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    
+    color = subparsers.add_parser('color', help="color correction kernel")
+    color.add_argument('--width', type=int, default=3840)
+    color.add_argument('--height', type=int, default=2160)
+    color.add_argument('--frames', type=int, default=20)
+    color.add_argument('--brightness', type=float, default=20)
+    color.add_argument('--contrast', type=float, default=1.2)
+    color.add_argument('--saturation', type=float, default=1.3)
+    color.set_defaults(func=bench_color)
+    
+    graph = subparsers.add_parser('graph', help="fused effect chain")
+    graph.add_argument('--width', type=int, default=3840)
+    graph.add_argument('--height', type=int, default=2160)
+    graph.add_argument('--frames', type=int, default=20)
+    graph.add_argument('--effects', type=int, default=5, choices=[3, 4, 5])
+    graph.add_argument('--duration', type=float, default=10.0)
+    graph.add_argument('--brightness', type=float, default=20)
+    graph.add_argument('--contrast', type=float, default=1.2)
+    graph.add_argument('--saturation', type=float, default=1.0)
+    graph.set_defaults(func=bench_graph)
+    
+    filters = subparsers.add_parser('filters', help="blur and sharpen filters")
+    filters.add_argument('--width', type=int, default=1920)
+    filters.add_argument('--height', type=int, default=1080)
+    filters.add_argument('--frames', type=int, default=20)
+    filters.set_defaults(func=bench_filters)
+    
+    tiles = subparsers.add_parser('tiles', help="strip-parallel effect kernels")
+    tiles.add_argument('--effect', default='color', choices=['color', 'sepia', 'black_white', 'blur', 'sharpen'])
+    tiles.add_argument('--width', type=int, default=7680)
+    tiles.add_argument('--height', type=int, default=4320)
+    tiles.add_argument('--frames', type=int, default=10)
+    tiles.add_argument('--workers', type=int, default=None)
+    tiles.add_argument('--amount', type=float, default=2.0, help="blur sigma or sharpen strength")
+    tiles.add_argument('--duration', type=float, default=10.0)
+    tiles.add_argument('--brightness', type=float, default=20)
+    tiles.add_argument('--contrast', type=float, default=1.2)
+    tiles.add_argument('--saturation', type=float, default=1.3)
+    tiles.set_defaults(func=bench_tiles)
+    
+    export = subparsers.add_parser('export', help="moviepy and pipe encode backends")
+    export.add_argument('project', help=".vep project file")
+    export.add_argument('--quality', default='medium', choices=['low', 'medium', 'high', 'ultra'])
+    export.add_argument('--preset', default='ultrafast', help="x264 preset, so encoding is not the bottleneck")
+    export.set_defaults(func=bench_export)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,7 +33,6 @@ def build_executable():
             '--hidden-import=cv2',
             '--hidden-import=numpy',
             '--hidden-import=PIL',
-            '--hidden-import=scipy',
             '--hidden-import=imageio',
             '--hidden-import=imageio_ffmpeg',
             '--hidden-import=PyQt6',
@@ -3,7 +3,9 @@ Video Clip Class
 Represents a video clip on the timeline
 """
 
-from moviepy.editor import VideoFileClip
+from moviepy.audio.fx.volumex import volumex
+from decoder_pool import get_decoder_pool
+from media_probe import probe
 import os
 
 class VideoClip:
@@ -29,59 +31,102 @@ class VideoClip:
         self.fade_in_duration = 0
         self.fade_out_duration = 0
         
-        # Load video to get duration
+        # Called with the clip whenever its timeline span changes
+        self.timing_listeners = []
+        
+        # Read duration from container metadata; the decoder itself is
+        # only opened from the shared pool once frames are needed
+        self.info = None
+        self.loaded = False
         try:
-            self.video_clip = VideoFileClip(filepath)
-            self.duration = self.video_clip.duration
+            self.info = probe(filepath)
+            self.duration = self.info.duration
             self.trim_end = self.duration
+            get_decoder_pool().acquire(filepath)
+            self.loaded = True
         except Exception as e:
             print(f"Error loading video: {e}")
-            self.video_clip = None
             self.duration = 0
     
-    def get_clip(self):
-        """Get the processed video clip with all effects applied"""
-        if not self.video_clip:
+    @property
+    def video_clip(self):
+        """Shared source reader for this clip's file"""
+        if not self.loaded:
             return None
+        return get_decoder_pool().get_reader(self.filepath)
+    
+    def close(self):
+        """Release this clip's reference to the shared reader"""
+        if self.loaded:
+            self.loaded = False
+            get_decoder_pool().release(self.filepath)
+    
+    def get_clip(self, progress=None):
+        """Get the processed video clip with all effects applied
         
-        clip = self.video_clip.subclip(self.trim_start, self.trim_end)
-        
-        # Apply speed
-        if self.speed != 1.0:
-            clip = clip.fx(lambda c: c.set_duration(c.duration / self.speed))
-            clip = clip.fx(lambda c: c.set_fps(c.fps * self.speed))
+        progress: optional ProgressTracker charged with source decode time
+        """
+        clip = self.get_source_clip(progress)
+        if clip is None:
+            return None
         
-        # Apply brightness/contrast/saturation
-        if self.brightness != 0 or self.contrast != 1.0 or self.saturation != 1.0:
-            from effects import apply_color_correction
-            clip = apply_color_correction(clip, self.brightness, self.contrast, self.saturation)
+        # Pixel effects run as one fused per-frame kernel
+        clip = self.get_effect_graph().apply(clip)
         
         # Apply volume
         if self.volume != 1.0:
-            clip = clip.volumex(self.volume)
+            clip = clip.fx(volumex, self.volume)
         
-        # Apply fades
-        if self.fade_in_duration > 0:
-            clip = clip.fadein(self.fade_in_duration)
-        if self.fade_out_duration > 0:
-            clip = clip.fadeout(self.fade_out_duration)
+        return clip
+    
+    def get_source_clip(self, progress=None):
+        """Get the trimmed, retimed source clip, before any pixel effects"""
+        if not self.loaded:
+            return None
         
+        clip = get_decoder_pool().view(self.filepath, self.trim_start, self.trim_end)
+        if progress is not None:
+            clip = clip.fl(lambda gf, t: progress.measure('decode', gf, t))
+        
+        # Apply speed
+        if self.speed != 1.0:
+            clip = clip.fx(lambda c: c.set_duration(c.duration / self.speed))
+            clip = clip.fx(lambda c: c.set_fps(c.fps * self.speed))
         return clip
     
+    def get_effect_graph(self):
+        """Get the pixel effects of this clip in application order"""
+        from effect_graph import EffectGraph
+        graph = EffectGraph()
+        graph.color_correction(self.brightness, self.contrast, self.saturation)
+        if self.fade_in_duration > 0:
+            graph.fadein(self.fade_in_duration)
+        if self.fade_out_duration > 0:
+            graph.fadeout(self.fade_out_duration)
+        return graph
+    
+    def describe_effects(self):
+        """Describe the fused effect plan, for debugging"""
+        duration = (self.trim_end - self.trim_start) / self.speed
+        return self.get_effect_graph().compile(duration).describe()
+    
     def split(self, split_time):
         """Split clip at specified time (relative to clip start)"""
         if split_time <= 0 or split_time >= self.duration:
             return None
         
-        # Create new clip for second part
+        # Create new clip for second part; it shares this clip's reader
         new_clip = VideoClip(self.filepath, self.start_time + split_time)
         new_clip.trim_start = self.trim_start + split_time
         new_clip.trim_end = self.trim_end
+        new_clip.duration = new_clip.trim_end - new_clip.trim_start
+        new_clip.end_time = new_clip.start_time + new_clip.duration
         
         # Update current clip
         self.trim_end = self.trim_start + split_time
         self.duration = split_time
         self.end_time = self.start_time + self.duration
+        self.notify_timing_changed()
         
         return new_clip
     
@@ -90,11 +135,28 @@ class VideoClip:
         self.trim_start = max(0, start)
         self.trim_end = min(self.duration, end)
         self.duration = self.trim_end - self.trim_start
+        self.end_time = self.start_time + self.duration
+        self.notify_timing_changed()
     
     def set_start_time(self, time):
         """Set the start time on timeline"""
         self.start_time = time
         self.end_time = self.start_time + self.duration
+        self.notify_timing_changed()
+    
+    def add_timing_listener(self, listener):
+        """Call listener(clip) when the clip moves or changes length"""
+        self.timing_listeners.append(listener)
+    
+    def remove_timing_listener(self, listener):
+        """Stop notifying a timing listener"""
+        if listener in self.timing_listeners:
+            self.timing_listeners.remove(listener)
+    
+    def notify_timing_changed(self):
+        """Tell listeners the timeline span changed"""
+        for listener in list(self.timing_listeners):
+            listener(self)
     
     def to_dict(self):
         """Convert clip to dictionary for saving"""
@@ -118,6 +180,8 @@ class VideoClip:
         clip = cls(data['filepath'], data['start_time'])
         clip.trim_start = data.get('trim_start', 0)
         clip.trim_end = data.get('trim_end', clip.duration)
+        clip.duration = clip.trim_end - clip.trim_start
+        clip.end_time = clip.start_time + clip.duration
         clip.brightness = data.get('brightness', 0)
         clip.contrast = data.get('contrast', 1.0)
         clip.saturation = data.get('saturation', 1.0)
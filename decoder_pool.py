@@ -0,0 +1,160 @@
+"""
+Decoder Pool
+Shares source readers between all clips cut from the same file
+"""
+
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from collections import OrderedDict
+import os
+import threading
+import weakref
+
+class PoolEntry:
+    """A source file tracked by the pool"""
+    
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.refcount = 0  # Clips referencing this source
+        self.pins = 0  # Renders currently reading from it
+        self.reader = None  # VideoFileClip, opened on demand
+        self.views = weakref.WeakSet()  # Per-clip views that read from the reader
+    
+    def in_use(self):
+        """Whether a render or a live view still reads from the reader"""
+        return self.pins > 0 or any(True for _ in self.views)
+
+class DecoderPool:
+    """Process-wide pool of reference-counted source readers"""
+    
+    def __init__(self, max_open=8):
+        self.max_open = max_open
+        self.entries = {}
+        self.open_entries = OrderedDict()  # Least recently used first
+        self.lock = threading.RLock()
+        self.opened = 0
+        self.evicted = 0
+    
+    def key(self, filepath):
+        """Pool key for a file path"""
+        return os.path.normcase(os.path.abspath(filepath))
+    
+    def acquire(self, filepath):
+        """Register a clip using filepath; the reader opens on first use"""
+        key = self.key(filepath)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = PoolEntry(filepath)
+                self.entries[key] = entry
+            entry.refcount += 1
+            return entry
+    
+    def release(self, filepath):
+        """Drop a clip's reference, closing the reader once nothing uses it"""
+        key = self.key(filepath)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            self._discard(key)
+    
+    def get_reader(self, filepath):
+        """Get the shared reader for an acquired file, reopening it if evicted"""
+        key = self.key(filepath)
+        with self.lock:
+            entry = self.entries[key]
+            if entry.reader is None:
+                self._open(key, entry)
+            else:
+                self.open_entries.move_to_end(key)
+            return entry.reader
+    
+    def view(self, filepath, start, end):
+        """Get a cheap per-clip view of a source; shares the reader
+        
+        The reader is neither evicted nor closed while the view, or a clip
+        derived from it, is alive.
+        """
+        key = self.key(filepath)
+        with self.lock:
+            view = self.get_reader(filepath).subclip(start, end)
+            self.entries[key].views.add(view)
+        weakref.finalize(view, self._discard, key)
+        return view
+    
+    def pin(self, filepath):
+        """Keep a reader open while a render is using it"""
+        with self.lock:
+            reader = self.get_reader(filepath)
+            self.entries[self.key(filepath)].pins += 1
+            return reader
+    
+    def unpin(self, filepath):
+        """Allow a pinned reader to be evicted again"""
+        key = self.key(filepath)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry.pins > 0:
+                entry.pins -= 1
+            self._discard(key)
+            self._evict()
+    
+    def close_all(self):
+        """Close every open reader"""
+        with self.lock:
+            for key, entry in list(self.open_entries.items()):
+                self._close(key, entry)
+    
+    def stats(self):
+        """Get pool counters"""
+        with self.lock:
+            return {
+                'sources': len(self.entries),
+                'open': len(self.open_entries),
+                'opened': self.opened,
+                'evicted': self.evicted
+            }
+    
+    def _open(self, key, entry):
+        """Open the reader for an entry"""
+        entry.reader = VideoFileClip(entry.filepath)
+        self.open_entries[key] = entry
+        self.opened += 1
+        self._evict(keep=key)
+    
+    def _close(self, key, entry):
+        """Close the reader for an entry"""
+        if entry.reader is not None:
+            entry.reader.close()
+            entry.reader = None
+        self.open_entries.pop(key, None)
+    
+    def _discard(self, key):
+        """Close and forget an entry no clip, render or view uses any more"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.refcount > 0 or entry.in_use():
+                return
+            self._close(key, entry)
+            del self.entries[key]
+    
+    def _evict(self, keep=None):
+        """Close least recently used idle readers until under the cap"""
+        if len(self.open_entries) <= self.max_open:
+            return
+        for key, entry in list(self.open_entries.items()):
+            if len(self.open_entries) <= self.max_open:
+                break
+            if not entry.in_use() and key != keep:
+                self._close(key, entry)
+                self.evicted += 1
+
+_pool = None
+
+def get_decoder_pool():
+    """Get the process-wide decoder pool"""
+    global _pool
+    if _pool is None:
+        _pool = DecoderPool()
+    return _pool
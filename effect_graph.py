@@ -0,0 +1,247 @@
+"""
+Effect Graph
+Fuses the pixel effects of a clip into a single per-frame kernel
+"""
+
+import numpy as np
+import cv2
+from effects import (compile_color_correction, blur_frame, box_blur_frame, sharpen_frame, blur_halo,
+                     LUMA_WEIGHTS, SEPIA_MATRIX, SHARPEN_HALO)
+from tiled_executor import get_tiled_executor
+from frame_arena import FrameArena
+
+# Node kinds
+POINT = 'lut'        # Per-level mapping, consecutive ones fuse into one table
+MATRIX = 'matrix'    # 3x4 color matrix, one cv2.transform pass
+WIDE = 'wide'        # Lookup table and color matrix at 16-bit precision
+FILTER = 'filter'    # Spatial filter that reads neighbouring pixels
+
+LEVELS = np.arange(256, dtype=np.float64)
+
+def truncating_matrix(matrix):
+    """Turn a 3x3 color matrix into a 3x4 one that truncates like astype(uint8)"""
+    result = np.zeros((3, 4))
+    result[:, :3] = matrix
+    result[:, 3] = -0.5  # cv2.transform rounds, so shift down half a level
+    return result
+
+def fade_lut(fading):
+    """Lookup table that fades every level towards black"""
+    return (LEVELS * fading).astype(np.uint8)
+
+class EffectNode:
+    """A single pixel operation in an effect graph"""
+    
+    def __init__(self, name, kind, lut=None, lut_at=None, matrix=None, func=None, halo=0):
+        self.name = name
+        self.kind = kind
+        self.lut = lut
+        self.lut_at = lut_at  # lut_at(t, duration) for time-dependent tables
+        self.matrix = matrix
+        self.func = func  # func(frame, out, arena) for filters, writing into out when given
+        self.halo = halo  # Rows of neighbours a filter reads on each side, None for the whole frame
+
+class EffectGraph:
+    """Collects the pixel effects of a clip in the order they are applied"""
+    
+    def __init__(self):
+        self.nodes = []
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def add(self, node):
+        """Append a node to the graph"""
+        self.nodes.append(node)
+        return self
+    
+    def color_correction(self, brightness=0, contrast=1.0, saturation=1.0):
+        """Add brightness, contrast and saturation"""
+        if brightness == 0 and contrast == 1.0 and saturation == 1.0:
+            return self
+        
+        correction = compile_color_correction(brightness, contrast, saturation)
+        if correction.wide:
+            return self.add(EffectNode("color correction", WIDE,
+                                       lut=correction.lut, matrix=correction.matrix))
+        
+        self.add(EffectNode("brightness/contrast", POINT, lut=correction.lut))
+        if correction.matrix is not None:
+            self.add(EffectNode("saturation", MATRIX, matrix=correction.matrix))
+        return self
+    
+    def fadein(self, duration):
+        """Add a fade in from black"""
+        def lut_at(t, clip_duration):
+            if t >= duration:
+                return None
+            return fade_lut(1.0 * t / duration)
+        
+        return self.add(EffectNode(f"fade in {duration:g}s", POINT, lut_at=lut_at))
+    
+    def fadeout(self, duration):
+        """Add a fade out to black"""
+        def lut_at(t, clip_duration):
+            if clip_duration - t >= duration:
+                return None
+            return fade_lut(1.0 * (clip_duration - t) / duration)
+        
+        return self.add(EffectNode(f"fade out {duration:g}s", POINT, lut_at=lut_at))
+    
+    def sepia(self):
+        """Add a sepia tone"""
+        return self.add(EffectNode("sepia", MATRIX, matrix=truncating_matrix(SEPIA_MATRIX)))
+    
+    def black_white(self):
+        """Add a grayscale conversion"""
+        matrix = truncating_matrix(np.tile(LUMA_WEIGHTS, (3, 1)))
+        return self.add(EffectNode("black & white", MATRIX, matrix=matrix))
+    
+    def invert(self):
+        """Add a color inversion"""
+        lut = (255 - LEVELS).astype(np.uint8)
+        return self.add(EffectNode("invert", POINT, lut=lut))
+    
+    def blur(self, blur_amount=5):
+        """Add a blur"""
+        return self.add(EffectNode(f"blur {blur_amount:g}", FILTER,
+                                   func=lambda frame, out, arena: blur_frame(frame, blur_amount, out, arena),
+                                   halo=blur_halo(blur_amount)))
+    
+    def box_blur(self, radius=2):
+        """Add a box blur"""
+        return self.add(EffectNode(f"box blur {radius:g}", FILTER,
+                                   func=lambda frame, out, arena: box_blur_frame(frame, radius, out),
+                                   halo=int(radius)))
+    
+    def sharpen(self, strength=1.0):
+        """Add a sharpen"""
+        return self.add(EffectNode(f"sharpen {strength:g}", FILTER,
+                                   func=lambda frame, out, arena: sharpen_frame(frame, strength, out, arena),
+                                   halo=SHARPEN_HALO))
+    
+    def compile(self, duration=None, tiled=True):
+        """Fuse the nodes into a kernel for a clip of the given duration
+        
+        Tiled kernels split large frames into strips that run in parallel.
+        """
+        return FusedKernel(self.nodes, duration, get_tiled_executor() if tiled else None)
+    
+    def apply(self, clip):
+        """Apply the graph to a moviepy clip with a single frame callback"""
+        if not self.nodes:
+            return clip
+        
+        kernel = self.compile(clip.duration)
+        return clip.fl(lambda gf, t: kernel(gf(t), t))
+
+class FusedStep:
+    """One pass over the frame, covering one or more graph nodes"""
+    
+    def __init__(self, kind, nodes):
+        self.kind = kind
+        self.nodes = nodes
+        
+        # Lookup tables run in sequence; everything but a wide step's own
+        # table composes into a single uint8 table
+        self.table_nodes = nodes[:-1] if kind == WIDE else nodes
+        self.time_dependent = any(node.lut_at for node in self.table_nodes)
+        self.static_lut = None
+        if not self.time_dependent:
+            self.static_lut = self.compose(0, None)
+    
+    def compose(self, t, duration):
+        """Compose the lookup tables of this step at time t"""
+        lut = None
+        for node in self.table_nodes:
+            table = node.lut if node.lut_at is None else node.lut_at(t, duration)
+            if table is None:
+                continue
+            lut = table if lut is None else table[lut]
+        return lut
+    
+    def lookup(self, t, duration):
+        """Get the fused lookup table at time t, None for identity"""
+        if self.time_dependent:
+            return self.compose(t, duration)
+        return self.static_lut
+
+class FusedKernel:
+    """Per-frame kernel that runs every effect of a graph on one buffer
+    
+    Intermediates live in the kernel's own arena, so once the first frame
+    has sized them a frame rendered into a given out allocates nothing.
+    """
+    
+    def __init__(self, nodes, duration=None, executor=None):
+        self.duration = duration
+        self.arena = FrameArena()
+        self.executor = executor  # TiledExecutor, or None to run on the calling thread
+        if any(node.halo is None for node in nodes):
+            self.executor = None  # A filter needs to see the whole frame
+        self.halo = sum(node.halo or 0 for node in nodes)  # Each filter widens what a strip needs
+        self.steps = []
+        
+        pending = []
+        for node in nodes:
+            if node.kind == POINT:
+                pending.append(node)
+            elif node.kind == WIDE:
+                # The 16-bit table absorbs any 8-bit tables before it
+                self.steps.append(FusedStep(WIDE, pending + [node]))
+                pending = []
+            else:
+                if pending:
+                    self.steps.append(FusedStep(POINT, pending))
+                    pending = []
+                self.steps.append(FusedStep(node.kind, [node]))
+        if pending:
+            self.steps.append(FusedStep(POINT, pending))
+    
+    def __call__(self, frame, t=0, out=None):
+        """Run the fused effects on a frame, writing into out when given"""
+        if frame.dtype != np.uint8:
+            frame = frame.astype(np.uint8)
+        if self.executor is None or not self.steps:
+            return self.apply(frame, t, out)
+        return self.executor.run(lambda src, dst: self.apply(src, t, dst), frame, self.halo, out)
+    
+    def apply(self, frame, t=0, out=None):
+        """Run the fused effects on a whole frame or one strip of it"""
+        # The decoded frame is read once; the first pass writes out, or a
+        # new buffer, and every later pass transforms that in place
+        written = False
+        for step in self.steps:
+            src = out if written else frame
+            
+            if step.kind == POINT:
+                lut = step.lookup(t, self.duration)
+                if lut is None:
+                    continue
+                out = cv2.LUT(src, lut, dst=out)
+            elif step.kind == MATRIX:
+                out = cv2.transform(src, step.nodes[0].matrix, dst=out)
+            elif step.kind == WIDE:
+                node = step.nodes[-1]
+                prefix = step.lookup(t, self.duration)
+                table = node.lut if prefix is None else node.lut[prefix]
+                wide = cv2.LUT(src, table, dst=self.arena.scratch('wide', src.shape, np.uint16))
+                cv2.transform(wide, node.matrix, dst=wide)
+                out = cv2.convertScaleAbs(wide, dst=out, alpha=1 / 256.0, beta=-0.5)
+            else:
+                result = step.nodes[0].func(src, out, self.arena)
+                if result is frame:
+                    continue  # The filter left the frame as it was
+                out = result
+            written = True
+        
+        return out if written else frame
+    
+    def describe(self):
+        """Describe the fused plan, one line per pass over the frame"""
+        lines = []
+        for i, step in enumerate(self.steps, 1):
+            names = ", ".join(node.name for node in step.nodes)
+            timing = " (per frame)" if step.time_dependent else ""
+            lines.append(f"{i}. {step.kind}{timing}: {names}")
+        return lines
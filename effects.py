@@ -3,80 +3,129 @@ Video Effects
 Various video effects and filters
 """
 
-from moviepy.editor import VideoClip
+from moviepy.video.VideoClip import VideoClip
+from functools import lru_cache
 import numpy as np
+import cv2
+import spatial_filters
 
-def apply_color_correction(clip, brightness=0, contrast=1.0, saturation=1.0):
-    """Apply color correction (brightness, contrast, saturation)"""
-    def adjust_frame(frame):
-        # Convert to float
-        frame = frame.astype(np.float32) / 255.0
+# ITU-R BT.601 luma weights used for saturation and grayscale
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114])
+
+SEPIA_MATRIX = np.array([[0.393, 0.769, 0.189],
+                         [0.349, 0.686, 0.168],
+                         [0.272, 0.534, 0.131]])
+
+class ColorCorrection:
+    """Color correction compiled into a lookup table and a color matrix"""
+    
+    def __init__(self, brightness=0, contrast=1.0, saturation=1.0):
+        self.brightness = brightness
+        self.contrast = contrast
+        self.saturation = saturation
         
-        # Apply brightness
-        frame = frame + brightness / 100.0
-        frame = np.clip(frame, 0, 1)
+        # Same float32 math as the per-pixel version, evaluated once per level
+        levels = np.arange(256, dtype=np.float32) / 255.0
+        levels = np.clip(levels + brightness / 100.0, 0, 1)
+        levels = np.clip((levels - 0.5) * contrast + 0.5, 0, 1)
         
-        # Apply contrast
-        frame = (frame - 0.5) * contrast + 0.5
-        frame = np.clip(frame, 0, 1)
+        self.matrix = None
+        self.wide = False
+        if saturation == 1.0:
+            self.lut = (levels * 255).astype(np.uint8)
+            return
         
-        # Apply saturation
-        gray = np.dot(frame[...,:3], [0.299, 0.587, 0.114])
-        gray = np.stack([gray, gray, gray], axis=2)
-        frame = gray + (frame - gray) * saturation
-        frame = np.clip(frame, 0, 1)
+        # Saturation mixes channels: gray + (frame - gray) * saturation is
+        # a single 3x4 color matrix applied with cv2.transform
+        matrix = np.zeros((3, 4))
+        matrix[:, :3] = (1 - saturation) * LUMA_WEIGHTS[np.newaxis, :]
+        matrix[:, :3] += saturation * np.eye(3)
         
-        # Convert back to uint8
-        return (frame * 255).astype(np.uint8)
+        if saturation < 1.0:
+            self.lut = np.round(levels.astype(np.float64) * 255).astype(np.uint8)
+            # -0.5 turns cv2's rounding into the truncation of astype(uint8)
+            matrix[:, 3] = -0.5
+        else:
+            # Boosting saturation amplifies rounding error, so keep 8
+            # fractional bits through the matrix and truncate at the end
+            self.lut = np.round(levels.astype(np.float64) * 255 * 256).astype(np.uint16)
+            self.wide = True
+        self.matrix = matrix
     
-    return clip.fl_image(adjust_frame)
+    def __call__(self, frame, out=None):
+        """Apply the correction to an RGB frame, writing into out when given"""
+        if frame.dtype != np.uint8:
+            frame = frame.astype(np.uint8)
+        
+        if self.wide:
+            wide = cv2.LUT(frame, self.lut)
+            cv2.transform(wide, self.matrix, dst=wide)
+            return cv2.convertScaleAbs(wide, dst=out, alpha=1 / 256.0, beta=-0.5)
+        
+        out = cv2.LUT(frame, self.lut, dst=out)
+        if self.matrix is not None:
+            cv2.transform(out, self.matrix, dst=out)
+        return out
+
+@lru_cache(maxsize=32)
+def compile_color_correction(brightness=0, contrast=1.0, saturation=1.0):
+    """Get the compiled color correction for a parameter set"""
+    return ColorCorrection(brightness, contrast, saturation)
+
+def apply_color_correction(clip, brightness=0, contrast=1.0, saturation=1.0):
+    """Apply color correction (brightness, contrast, saturation)"""
+    from effect_graph import EffectGraph
+    return EffectGraph().color_correction(brightness, contrast, saturation).apply(clip)
+
+SHARPEN_SIGMA = 1.0  # Radius of the detail sharpen_frame boosts
+
+def blur_halo(blur_amount=5):
+    """Rows of neighbours blur_frame reads on each side, None if it needs the whole frame"""
+    return spatial_filters.blur_halo(blur_amount)
+
+SHARPEN_HALO = spatial_filters.blur_halo(SHARPEN_SIGMA)
+
+def blur_frame(frame, blur_amount=5, out=None, arena=None):
+    """Blur a single frame with a per-channel Gaussian of sigma blur_amount"""
+    return spatial_filters.gaussian_blur(frame, blur_amount, out, arena)
+
+def box_blur_frame(frame, radius=2, out=None, arena=None):
+    """Blur a single frame with a per-channel box filter"""
+    return spatial_filters.box_blur(frame, radius, out)
+
+def sharpen_frame(frame, strength=1.0, out=None, arena=None):
+    """Sharpen a single frame with an unsharp mask"""
+    return spatial_filters.unsharp_mask(frame, SHARPEN_SIGMA, strength, out, arena)
 
 def apply_blur(clip, blur_amount=5):
     """Apply blur effect"""
-    from scipy import ndimage
-    
-    def blur_frame(frame):
-        return ndimage.gaussian_filter(frame, sigma=blur_amount)
-    
-    return clip.fl_image(blur_frame)
+    from effect_graph import EffectGraph
+    return EffectGraph().blur(blur_amount).apply(clip)
+
+def apply_box_blur(clip, radius=2):
+    """Apply box blur effect"""
+    from effect_graph import EffectGraph
+    return EffectGraph().box_blur(radius).apply(clip)
 
 def apply_sharpen(clip, strength=1.0):
     """Apply sharpen effect"""
-    kernel = np.array([[-1, -1, -1],
-                       [-1,  9, -1],
-                       [-1, -1, -1]]) * strength
-    
-    def sharpen_frame(frame):
-        from scipy import ndimage
-        return ndimage.convolve(frame, kernel)
-    
-    return clip.fl_image(sharpen_frame)
+    from effect_graph import EffectGraph
+    return EffectGraph().sharpen(strength).apply(clip)
 
 def apply_sepia(clip):
     """Apply sepia tone effect"""
-    def sepia_frame(frame):
-        frame = frame.astype(np.float32)
-        sepia_matrix = np.array([[0.393, 0.769, 0.189],
-                                [0.349, 0.686, 0.168],
-                                [0.272, 0.534, 0.131]])
-        frame = np.dot(frame, sepia_matrix.T)
-        return np.clip(frame, 0, 255).astype(np.uint8)
-    
-    return clip.fl_image(sepia_frame)
+    from effect_graph import EffectGraph
+    return EffectGraph().sepia().apply(clip)
 
 def apply_black_white(clip):
     """Convert to black and white"""
-    def grayscale_frame(frame):
-        gray = np.dot(frame[...,:3], [0.299, 0.587, 0.114])
-        return np.stack([gray, gray, gray], axis=2).astype(np.uint8)
-    return clip.fl_image(grayscale_frame)
+    from effect_graph import EffectGraph
+    return EffectGraph().black_white().apply(clip)
 
 def apply_invert(clip):
     """Invert colors"""
-    def invert_frame(frame):
-        return 255 - frame
-    
-    return clip.fl_image(invert_frame)
+    from effect_graph import EffectGraph
+    return EffectGraph().invert().apply(clip)
 
 def change_speed(clip, speed_factor):
     """Change playback speed"""
@@ -3,8 +3,18 @@ Export Manager
 Handles video export and rendering
 """
 
-from moviepy.editor import VideoFileClip, concatenate_videoclips, CompositeVideoClip
+from moviepy.video.compositing.concatenate import concatenate_videoclips
+from decoder_pool import get_decoder_pool
+from smart_render import SmartRenderer, SmartRenderUnavailable, write_video, open_writer, kill_writer
+from parallel_export import ParallelExporter, SEGMENT_LENGTH
+from export_progress import ProgressTracker
+from export_pipeline import ExportPipeline
+import numpy as np
 import os
+from time import perf_counter
+
+QUALITIES = ('low', 'medium', 'high', 'ultra')  # Keys of get_codec_settings
+BACKENDS = ('moviepy', 'pipe')  # Encoders for rendered frames
 
 class ExportManager:
     """Manages video export"""
@@ -12,56 +22,121 @@ class ExportManager:
     def __init__(self):
         self.progress_callback = None
     
-    def export(self, clips, output_path, progress_callback=None, quality='high'):
-        """Export video from clips"""
+    def export(self, clips, output_path, progress_callback=None, quality='high', smart_render=False,
+               workers=1, segment_length=SEGMENT_LENGTH, progress_log=None, cancel_event=None, preset=None,
+               backend='moviepy', pipelined=True):
+        """Export video from clips
+        
+        progress_callback receives ExportProgress snapshots as frames are
+        written; progress_log, if given, gets them as JSON lines.
+        smart_render stream-copies untouched footage; with more than one
+        worker, segments of segment_length seconds render in parallel.
+        Setting cancel_event stops the export with ExportCancelled and
+        removes the partial output. preset overrides the quality's x264 preset.
+        backend picks the encoder: 'moviepy' or 'pipe', which streams raw
+        frames to ffmpeg without copying them. Unless pipelined is False, a
+        serial render decodes, applies effects and encodes concurrently.
+        """
         self.progress_callback = progress_callback
         
         if not clips:
             raise ValueError("No clips to export")
         
-        # Get processed clips
-        processed_clips = []
-        for i, clip in enumerate(clips):
-            if progress_callback:
-                progress = int((i / len(clips)) * 100)
-                progress_callback(progress)
-            
-            processed_clip = clip.get_clip()
-            if processed_clip:
-                processed_clips.append(processed_clip)
+        progress = ProgressTracker(progress_callback, progress_log, cancel_event)
+        settings = self.get_codec_settings(quality)
+        if preset:
+            settings = dict(settings, preset=preset)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown encode backend: {backend}")
+        settings = dict(settings, backend=backend)
         
-        if not processed_clips:
-            raise ValueError("No valid clips to export")
+        # Keep every source reader open for the whole render. Readers always
+        # decode clip.filepath, the original media, never a proxy
+        pool = get_decoder_pool()
+        pinned = [clip.filepath for clip in clips if clip.loaded]
+        for filepath in pinned:
+            pool.pin(filepath)
         
-        # Concatenate clips
-        if progress_callback:
-            progress_callback(50)
+        try:
+            if smart_render:
+                try:
+                    SmartRenderer(settings).render(clips, output_path, progress)
+                    return progress.finish()
+                except SmartRenderUnavailable as e:
+                    print(f"Smart render not possible, rendering everything: {e}")
+            if workers > 1:
+                exporter = ParallelExporter(settings, workers, segment_length)
+                exporter.render(clips, output_path, progress)
+            else:
+                self.render(clips, output_path, progress, settings, pipelined)
+            return progress.finish()
+        except BaseException:
+            if os.path.exists(output_path):
+                try:
+                    os.remove(output_path)
+                except OSError as e:
+                    print(f"Error removing partial export: {e}")
+            raise
+        finally:
+            for filepath in pinned:
+                pool.unpin(filepath)
+    
+    def render(self, clips, output_path, progress, codec_settings, pipelined=True):
+        """Render clips whose readers are pinned
         
-        final_clip = concatenate_videoclips(processed_clips, method="compose")
+        Pipelined renders decode, apply effects and encode concurrently;
+        otherwise moviepy produces and encodes one frame at a time.
+        """
+        loaded = [clip for clip in clips if clip.loaded]
+        processed_clips = [clip.get_clip(None if pipelined else progress) for clip in loaded]
         
-        # Determine codec and bitrate based on quality
-        codec_settings = self.get_codec_settings(quality)
+        if not processed_clips:
+            raise ValueError("No valid clips to export")
         
-        if progress_callback:
-            progress_callback(75)
+        final_clip = concatenate_videoclips(processed_clips, method="compose")
         
-        # Write video file
-        final_clip.write_videofile(
-            output_path,
-            codec=codec_settings['codec'],
-            bitrate=codec_settings['bitrate'],
-            fps=codec_settings.get('fps', 30),
-            preset=codec_settings.get('preset', 'medium'),
-            threads=4
-        )
+        fps = codec_settings.get('fps', 30)
         
-        if progress_callback:
-            progress_callback(100)
+        # Count frames as write_videofile pulls them
+        output_clip = final_clip.fl(progress.output_frame)
+        progress.begin(len(np.arange(0, final_clip.duration, 1.0 / fps)), fps)
         
-        # Clean up
-        final_clip.close()
-        for clip in processed_clips:
-            clip.close()
+        # Write the audio to a temp file next to the output, then the video
+        temp_audio = output_path + '.audio.part.mp3'
+        options = {
+            'vcodec': codec_settings['codec'],
+            'video_bitrate': codec_settings['bitrate'],
+            'preset': codec_settings.get('preset', 'medium'),
+            'backend': codec_settings.get('backend', 'moviepy')
+        }
+        try:
+            audiofile = None
+            start = perf_counter()
+            if final_clip.audio is not None:
+                final_clip.audio.write_audiofile(temp_audio, fps=44100, nbytes=4, buffersize=2000,
+                                                 codec='libmp3lame', logger=progress.get_logger())
+                audiofile = temp_audio
+            
+            if pipelined:
+                progress.add_time('audio', perf_counter() - start)
+                writer = open_writer(output_path, final_clip.size, fps, options, threads=4, audiofile=audiofile)
+                try:
+                    ExportPipeline(fps).render(loaded, writer, progress)
+                except BaseException:
+                    kill_writer(writer)
+                    raise
+                start = perf_counter()
+                writer.close()
+                progress.add_time('encode', perf_counter() - start)  # Flushing the encoder
+            else:
+                write_video(output_clip, output_path, fps, options, threads=4, audiofile=audiofile)
+        finally:
+            if os.path.exists(temp_audio):
+                os.remove(temp_audio)
+            
+            # The processed clips are views that share pooled readers, so
+            # closing them would close the readers too
+            final_clip.close()
     
     def get_codec_settings(self, quality='high'):
         """Get codec settings based on quality"""
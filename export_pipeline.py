@@ -0,0 +1,207 @@
+"""
+Export Pipeline
+Decodes, applies effects to and encodes export frames concurrently
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import queue
+import threading
+from time import perf_counter
+import numpy as np
+from smart_render import get_frame_times
+from frame_arena import FrameArena
+
+QUEUE_DEPTH = 8  # Frames in flight between the decoder and the encoder
+EFFECT_WORKERS = min(4, os.cpu_count() or 1)
+PUT_POLL = 0.1  # Seconds between stop checks while the decoder waits
+
+PIPELINE_STAGES = ('decode', 'effects', 'encode')
+
+class StageStats:
+    """Time one pipeline stage spent working and stalled"""
+    
+    def __init__(self, threads=1):
+        self.threads = threads
+        self.busy = 0.0
+        self.stalled = 0.0  # Decode: waiting for room downstream; effects and encode: waiting for frames
+        self.frames = 0
+        self.lock = threading.Lock()  # Effect workers add concurrently
+    
+    def add(self, busy=0.0, stalled=0.0, frames=0):
+        """Record work done"""
+        with self.lock:
+            self.busy += busy
+            self.stalled += stalled
+            self.frames += frames
+    
+    def occupancy(self, wall):
+        """Share of the stage's threads' time spent working"""
+        return self.busy / (wall * self.threads) if wall > 0 else 0.0
+
+class PipelineStats:
+    """Per-stage occupancy and stalls of one pipelined export"""
+    
+    def __init__(self, effect_workers):
+        self.stages = {
+            'decode': StageStats(),
+            'effects': StageStats(effect_workers),
+            'encode': StageStats()
+        }
+        self.start_time = perf_counter()
+        self.wall = 0.0
+    
+    def stop(self):
+        """Fix the wall time the occupancies are measured against"""
+        self.wall = perf_counter() - self.start_time
+        effects = self.stages['effects']
+        effects.stalled = max(0.0, self.wall * effects.threads - effects.busy)  # Idle workers
+    
+    def bottleneck(self):
+        """Stage with the highest occupancy"""
+        return max(PIPELINE_STAGES, key=lambda name: self.stages[name].occupancy(self.wall))
+    
+    def describe(self):
+        """One line per stage, e.g. 'decode: 93% busy, 0.2s stalled'"""
+        return [f"{name}: {self.stages[name].occupancy(self.wall) * 100:.0f}% busy, "
+                f"{self.stages[name].stalled:.1f}s stalled" for name in PIPELINE_STAGES]
+    
+    def to_dict(self):
+        """Machine readable form"""
+        data = {
+            name: {
+                'busy': round(stage.busy, 3),
+                'stalled': round(stage.stalled, 3),
+                'occupancy': round(stage.occupancy(self.wall), 3),
+                'threads': stage.threads
+            }
+            for name, stage in self.stages.items()
+        }
+        data['bottleneck'] = self.bottleneck()
+        return data
+
+class ExportPipeline:
+    """Renders a timeline with decoding, effects and encoding overlapped
+    
+    A decoder thread reads source frames in output order and hands each to
+    a pool of effect workers; the fused cv2 kernels release the GIL, so
+    effects run in parallel with decoding and encoding. The encoder takes
+    finished frames in order from a queue of at most queue_depth frames,
+    which bounds the frames in flight, and so memory, to about that. Frames are
+    sampled and composited exactly as concatenate_videoclips would.
+    
+    Effects render straight into output frames from a pool that the encoder
+    returns them to, so once the pool has filled no frames are allocated.
+    """
+    
+    def __init__(self, fps, workers=EFFECT_WORKERS, queue_depth=QUEUE_DEPTH):
+        self.fps = fps
+        self.workers = max(1, workers)
+        self.queue_depth = max(1, queue_depth)
+    
+    def render(self, clips, writer, progress):
+        """Write every output frame of loaded clips to an open writer"""
+        sources = [clip.get_source_clip() for clip in clips]
+        kernels = []
+        for clip, source in zip(clips, sources):
+            graph = clip.get_effect_graph()
+            kernels.append(graph.compile(source.duration) if len(graph) else None)
+        size = (max(s.w for s in sources), max(s.h for s in sources))
+        frame_times = get_frame_times([s.duration for s in sources], self.fps)
+        schedule = [(index, t) for index, times in enumerate(frame_times) for t in times]
+        
+        stats = PipelineStats(self.workers)
+        progress.pipeline = stats
+        arena = FrameArena()  # Output frames, reused once encoded
+        frames = queue.Queue(maxsize=self.queue_depth)  # Futures of effect results, in output order
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export-effects')
+        decoder = threading.Thread(target=self.decode, name='export-decode',
+                                   args=(sources, kernels, schedule, size, frames, executor, stop, stats, arena))
+        decoder.start()
+        charged = dict.fromkeys(PIPELINE_STAGES, 0.0)
+        try:
+            encode = stats.stages['encode']
+            while True:
+                start = perf_counter()
+                item = frames.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                frame = item.result()
+                ready = perf_counter()
+                writer.write_frame(frame)
+                arena.release(frame)
+                encode.add(busy=perf_counter() - ready, stalled=ready - start, frames=1)
+                self.charge(stats, charged, progress)
+                progress.advance()
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            decoder.join()
+            stats.stop()
+            self.charge(stats, charged, progress)
+        return stats
+    
+    def decode(self, sources, kernels, schedule, size, frames, executor, stop, stats, arena):
+        """Read source frames in order and queue their effect work; runs on the decoder thread"""
+        stage = stats.stages['decode']
+        try:
+            for index, t in schedule:
+                start = perf_counter()
+                frame = sources[index].get_frame(t)
+                decoded = perf_counter()
+                future = executor.submit(self.process, frame, kernels[index], t, size, stats, arena)
+                if not self.put(frames, future, stop):
+                    return
+                stage.add(busy=decoded - start, stalled=perf_counter() - decoded, frames=1)
+            self.put(frames, None, stop)
+        except BaseException as e:
+            self.put(frames, e, stop)  # Raised again on the encoder side
+    
+    def put(self, frames, item, stop):
+        """Queue an item, waiting for room; False once the pipeline is stopping"""
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=PUT_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def process(self, frame, kernel, t, size, stats, arena):
+        """Apply a clip's effects and place the frame on the output canvas; runs on an effect worker"""
+        start = perf_counter()
+        width, height = size
+        placed = frame.shape[0] != height or frame.shape[1] != width
+        if kernel is None and not placed and frame.dtype == np.uint8:
+            result = frame  # Nothing to do, encode the decoded frame as it is
+        else:
+            result = arena.acquire((height, width, 3))
+            target = self.place(result, frame) if placed else result
+            if kernel is not None:
+                frame = kernel(frame, t, target)
+            if frame is not target:
+                target[...] = frame[..., :3]
+        stats.stages['effects'].add(busy=perf_counter() - start, frames=1)
+        return result
+    
+    def place(self, canvas, frame):
+        """Black out the canvas around a centered frame, as a composited
+        concatenation does, and return the region the frame goes in"""
+        height, width = frame.shape[:2]
+        x = int((canvas.shape[1] - width) / 2)
+        y = int((canvas.shape[0] - height) / 2)
+        canvas[:y] = 0
+        canvas[y + height:] = 0
+        canvas[y:y + height, :x] = 0
+        canvas[y:y + height, x + width:] = 0
+        return canvas[y:y + height, x:x + width]
+    
+    def charge(self, stats, charged, progress):
+        """Move stage work done since the last call into the progress stage times"""
+        for name in PIPELINE_STAGES:
+            busy = stats.stages[name].busy
+            progress.add_time(name, busy - charged[name])
+            charged[name] = busy
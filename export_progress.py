@@ -0,0 +1,226 @@
+"""
+Export Progress
+Tracks frames written, throughput, ETA and time per stage during an export
+"""
+
+from collections import deque
+from time import perf_counter
+import json
+from proglog import ProgressBarLogger
+
+STAGES = ('audio', 'decode', 'effects', 'encode')
+UPDATE_INTERVAL = 0.25  # Seconds between reports
+RATE_WINDOW = 2.0  # Seconds of history behind the current fps
+
+def format_duration(seconds):
+    """Format seconds as m:ss or h:mm:ss"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+class ExportCancelled(Exception):
+    """Raised inside an export when it has been cancelled"""
+
+class ExportProgress:
+    """Snapshot of a running export"""
+    
+    def __init__(self, frames_done, frames_total, fps, speed, elapsed, eta, stage_times, finished=False,
+                 pipeline=None):
+        self.frames_done = frames_done
+        self.frames_total = frames_total
+        self.fps = fps  # Frames written per second, recently
+        self.speed = speed  # Encode speed relative to real time
+        self.elapsed = elapsed
+        self.eta = eta  # Seconds left, None until frames are flowing
+        self.stage_times = stage_times  # Seconds spent per stage
+        self.finished = finished
+        self.pipeline = pipeline  # PipelineStats.to_dict() of a pipelined render
+    
+    @property
+    def percent(self):
+        """Percentage of frames written"""
+        if self.finished:
+            return 100
+        if not self.frames_total:
+            return 0
+        return min(99, int(self.frames_done * 100 / self.frames_total))
+    
+    def describe(self):
+        """One line summary for a status bar"""
+        text = f"{self.percent}% ({self.frames_done}/{self.frames_total} frames"
+        if self.fps:
+            text += f", {self.fps:.1f} fps, {self.speed:.2f}x"
+        if self.eta is not None and not self.finished:
+            text += f", {format_duration(self.eta)} left"
+        return text + ")"
+    
+    def describe_stages(self):
+        """Share of time per stage, e.g. 'decode 40% effects 10% encode 50%'"""
+        total = sum(self.stage_times.values())
+        if not total:
+            return ""
+        text = " ".join(f"{stage} {seconds * 100 / total:.0f}%"
+                        for stage, seconds in self.stage_times.items() if seconds)
+        if self.pipeline:
+            text += f" (bottleneck: {self.pipeline['bottleneck']})"
+        return text
+    
+    def to_dict(self):
+        """Machine readable form"""
+        data = {
+            'frames_done': self.frames_done,
+            'frames_total': self.frames_total,
+            'percent': self.percent,
+            'fps': round(self.fps, 2),
+            'speed': round(self.speed, 3),
+            'elapsed': round(self.elapsed, 3),
+            'eta': None if self.eta is None else round(self.eta, 1),
+            'stages': {stage: round(seconds, 3) for stage, seconds in self.stage_times.items()},
+            'finished': self.finished
+        }
+        if self.pipeline:
+            data['pipeline'] = self.pipeline
+        return data
+
+class ProgressTracker:
+    """Counts frames as they are written and reports ExportProgress snapshots
+    
+    Reports go to callback(progress) at most every UPDATE_INTERVAL seconds
+    and, when log_path is set, are appended to it as JSON lines.
+    """
+    
+    def __init__(self, callback=None, log_path=None, cancel_event=None, clock=perf_counter):
+        self.callback = callback
+        self.log_path = log_path
+        self.cancel_event = cancel_event  # threading.Event that stops the export
+        self.clock = clock
+        self.frames_total = 0
+        self.output_fps = 30
+        self.pipeline = None  # PipelineStats, set by a pipelined render
+        self.begin(0)
+        self.started = False
+    
+    def begin(self, frames_total, output_fps=30):
+        """Start timing an export of frames_total frames"""
+        self.frames_total = frames_total
+        self.output_fps = output_fps
+        self.frames_done = 0
+        self.start_time = self.clock()
+        self.last_report = None
+        self.history = deque([(self.start_time, 0)])
+        self.times = {stage: 0.0 for stage in STAGES}
+        self.render_time = 0.0  # Decode and effects, as seen at the output
+        self.frame_end = None  # When the output last returned a frame
+        self.started = True
+    
+    def add_time(self, stage, seconds):
+        """Charge time to a stage"""
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+    
+    def measure(self, stage, get_frame, t):
+        """Get a frame, charging the time to a stage; a moviepy fl callback"""
+        start = self.clock()
+        frame = get_frame(t)
+        self.add_time(stage, self.clock() - start)
+        return frame
+    
+    def output_frame(self, get_frame, t):
+        """Produce one output frame; wraps the clip handed to the encoder
+        
+        Time between frames is the encoder consuming the previous one, and
+        the time before the first frame is spent writing the audio track.
+        """
+        if not self.started:
+            return get_frame(t)  # Moviepy reads a frame when the clip is wrapped
+        self.check_cancelled()
+        start = self.clock()
+        if self.frame_end is None:
+            self.add_time('audio', start - self.start_time)
+        else:
+            self.add_time('encode', start - self.frame_end)
+        frame = get_frame(t)
+        self.frame_end = self.clock()
+        self.render_time += self.frame_end - start
+        self.advance()
+        return frame
+    
+    def advance(self, frames=1):
+        """Record frames written"""
+        self.frames_done += frames
+        self.report()
+        self.check_cancelled()
+    
+    def check_cancelled(self):
+        """Raise ExportCancelled once the cancel event is set"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ExportCancelled("Export cancelled")
+    
+    def get_logger(self):
+        """Moviepy logger that stops audio and video writing on cancel"""
+        return CancelLogger(self)
+    
+    def snapshot(self, finished=False):
+        """Current progress"""
+        now = self.clock()
+        elapsed = now - self.start_time
+        
+        # Current rate over the last few seconds
+        history = self.history
+        history.append((now, self.frames_done))
+        while len(history) > 2 and now - history[1][0] > RATE_WINDOW:
+            history.popleft()
+        span = now - history[0][0]
+        fps = (self.frames_done - history[0][1]) / span if span > 0 else 0.0
+        if finished:
+            fps = self.frames_done / elapsed if elapsed > 0 else 0.0  # Average over the export
+        
+        eta = None
+        if fps > 0:
+            eta = max(0.0, (self.frames_total - self.frames_done) / fps)
+        
+        stage_times = dict(self.times)
+        stage_times['effects'] += max(0.0, self.render_time - stage_times['decode'])
+        if self.frame_end is not None and finished:
+            stage_times['encode'] += now - self.frame_end  # Flushing the encoder
+        
+        pipeline = self.pipeline.to_dict() if self.pipeline and finished else None
+        return ExportProgress(self.frames_done, self.frames_total, fps, fps / self.output_fps,
+                              elapsed, eta, stage_times, finished, pipeline)
+    
+    def report(self, force=False):
+        """Send a snapshot if one is due"""
+        now = self.clock()
+        if not force and self.last_report is not None and now - self.last_report < UPDATE_INTERVAL:
+            return
+        self.last_report = now
+        self.send(self.snapshot())
+    
+    def finish(self):
+        """Send the final snapshot"""
+        progress = self.snapshot(finished=True)
+        self.send(progress)
+        return progress
+    
+    def send(self, progress):
+        """Pass a snapshot to the callback and the log"""
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(progress.to_dict()) + '\n')
+            except OSError as e:
+                print(f"Error writing progress log: {e}")
+        if self.callback:
+            self.callback(progress)
+
+class CancelLogger(ProgressBarLogger):
+    """Proglog logger that checks for cancellation on every update"""
+    
+    def __init__(self, progress):
+        super().__init__()
+        self.progress = progress
+    
+    def callback(self, **changes):
+        self.progress.check_cancelled()
@@ -0,0 +1,56 @@
+"""
+Export Worker
+Runs an export in the background so the editor stays responsive
+"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+import threading
+from clip import VideoClip
+from export_progress import ExportCancelled
+
+class ExportWorker(QThread):
+    """Exports a snapshot of the timeline on a background thread
+    
+    The clips are copied when the worker is created, so the timeline can be
+    edited while the export runs. Progress arrives through signals on the
+    GUI thread.
+    """
+    
+    progress_changed = pyqtSignal(object)  # ExportProgress
+    export_finished = pyqtSignal(object)  # Final ExportProgress
+    export_failed = pyqtSignal(str)
+    export_cancelled = pyqtSignal()
+    
+    def __init__(self, export_manager, clips, output_path, **options):
+        super().__init__()
+        self.export_manager = export_manager
+        self.clip_data = [clip.to_dict() for clip in clips]
+        self.output_path = output_path
+        self.options = options  # Keyword arguments for ExportManager.export
+        self.cancel_event = threading.Event()
+    
+    def cancel(self):
+        """Ask the export to stop; it removes its partial output"""
+        self.cancel_event.set()
+    
+    def is_cancelled(self):
+        """Whether cancel() was called"""
+        return self.cancel_event.is_set()
+    
+    def run(self):
+        """Export the snapshot and release its readers"""
+        clips = [VideoClip.from_dict(data) for data in self.clip_data]
+        try:
+            progress = self.export_manager.export(clips, self.output_path, self.progress_changed.emit,
+                                                  cancel_event=self.cancel_event, **self.options)
+            self.export_finished.emit(progress)
+        except ExportCancelled:
+            self.export_cancelled.emit()
+        except Exception as e:
+            if self.is_cancelled():
+                self.export_cancelled.emit()  # Cancelling can surface as a broken pipe
+            else:
+                self.export_failed.emit(str(e))
+        finally:
+            for clip in clips:
+                clip.close()
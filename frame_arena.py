@@ -0,0 +1,59 @@
+"""
+Frame Arena
+Reusable frame buffers, so steady-state rendering allocates no new frames
+"""
+
+import math
+import threading
+import numpy as np
+
+class FrameArena:
+    """Hands out frame buffers that are reused from one frame to the next
+    
+    Scratch buffers belong to the calling thread and are reused whenever the
+    same name is asked for again, growing to the largest shape seen, so they
+    only hold intermediates that are done with before the next one of that
+    name is needed. Frames that outlive the call that made them are taken
+    with acquire and handed back with release once they have been consumed.
+    """
+    
+    def __init__(self):
+        self.local = threading.local()
+        self.free = {}  # (shape, dtype) -> released buffers ready for reuse
+        self.owned = {}  # id -> buffer, for every buffer acquire has made
+        self.lock = threading.Lock()
+    
+    def scratch(self, name, shape, dtype=np.uint8):
+        """Get this thread's contiguous buffer of a shape for an intermediate result"""
+        buffers = getattr(self.local, 'buffers', None)
+        if buffers is None:
+            buffers = self.local.buffers = {}
+        dtype = np.dtype(dtype)
+        size = math.prod(shape)
+        buffer = buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            buffer = buffers[name] = np.empty(size, dtype=dtype)
+        return buffer[:size].reshape(shape)
+    
+    def acquire(self, shape, dtype=np.uint8):
+        """Get a buffer for a frame that is handed on, reusing a released one when possible"""
+        key = (tuple(shape), np.dtype(dtype))
+        with self.lock:
+            free = self.free.get(key)
+            if free:
+                return free.pop()
+        buffer = np.empty(shape, dtype=dtype)
+        with self.lock:
+            self.owned[id(buffer)] = buffer
+        return buffer
+    
+    def release(self, buffer):
+        """Hand back an acquired buffer; anything else is ignored"""
+        with self.lock:
+            if self.owned.get(id(buffer)) is buffer:
+                self.free.setdefault((buffer.shape, buffer.dtype), []).append(buffer)
+    
+    def count(self):
+        """Number of buffers acquire has made"""
+        with self.lock:
+            return len(self.owned)
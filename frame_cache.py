@@ -0,0 +1,76 @@
+"""
+Frame Cache
+Keeps recently decoded frames within a memory budget
+"""
+
+from collections import OrderedDict
+import threading
+
+class FrameCache:
+    """LRU cache of frames keyed by file, frame index and decode resolution"""
+    
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()  # Least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get(self, filepath, frame_index, resolution):
+        """Get a cached frame, or None"""
+        key = (filepath, frame_index, tuple(resolution))
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+    
+    def put(self, filepath, frame_index, resolution, frame):
+        """Store a frame; cached frames are made read-only"""
+        if frame.nbytes > self.max_bytes:
+            return
+        frame.flags.writeable = False
+        
+        key = (filepath, frame_index, tuple(resolution))
+        with self.lock:
+            old = self.frames.pop(key, None)
+            if old is not None:
+                self.size -= old.nbytes
+            self.frames[key] = frame
+            self.size += frame.nbytes
+            self._evict()
+    
+    def set_budget(self, max_bytes):
+        """Change the memory budget"""
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+    
+    def clear(self):
+        """Drop every cached frame"""
+        with self.lock:
+            self.frames.clear()
+            self.size = 0
+    
+    def stats(self):
+        """Get cache counters"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'frames': len(self.frames),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes
+            }
+    
+    def _evict(self):
+        """Drop least recently used frames until within budget"""
+        while self.size > self.max_bytes and self.frames:
+            _, frame = self.frames.popitem(last=False)
+            self.size -= frame.nbytes
@@ -0,0 +1,94 @@
+"""
+Frame Pipe
+Streams raw RGB frames into an ffmpeg encoder without intermediate copies
+"""
+
+import os
+import threading
+import numpy as np
+import ffmpeg
+
+class FramePipeWriter:
+    """Encodes frames written as numpy arrays through ffmpeg's stdin
+    
+    Contiguous uint8 frames of the output size go to the pipe as a
+    memoryview, so the bytes are never copied in Python. Anything else is
+    converted into one preallocated buffer first. Writes block while the
+    encoder is busy, which keeps rendering from running ahead of it.
+    """
+    
+    def __init__(self, path, size, fps, options, threads=None, audiofile=None):
+        self.path = path
+        width, height = size
+        video = ffmpeg.input('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{width}x{height}', framerate=fps)
+        streams = [video]
+        output_args = {'vcodec': options['vcodec'], 'preset': options['preset']}
+        if options.get('video_bitrate'):
+            output_args['video_bitrate'] = options['video_bitrate']
+        if threads:
+            output_args['threads'] = threads
+        pix_fmt = options.get('pix_fmt')
+        if pix_fmt is None and options['vcodec'] == 'libx264' and width % 2 == 0 and height % 2 == 0:
+            pix_fmt = 'yuv420p'  # As moviepy's writer does
+        if pix_fmt:
+            output_args['pix_fmt'] = pix_fmt
+        if audiofile:
+            streams.append(ffmpeg.input(audiofile).audio)  # Muxed as its own stream
+            output_args['acodec'] = 'copy'
+        
+        stream = ffmpeg.output(*streams, path, **output_args).global_args('-loglevel', 'error')
+        self.process = stream.overwrite_output().run_async(pipe_stdin=True, pipe_stderr=True)
+        self.fd = self.process.stdin.fileno()
+        self.buffer = np.empty((height, width, 3), dtype=np.uint8)
+        self.frames = 0
+        self.converted = 0  # Frames that needed the conversion buffer
+        
+        # Drain stderr so a chatty encoder can never block on it
+        self.stderr = b''
+        self.stderr_thread = threading.Thread(target=self.read_stderr, daemon=True)
+        self.stderr_thread.start()
+    
+    def read_stderr(self):
+        """Collect the encoder's error output"""
+        self.stderr = self.process.stderr.read()
+    
+    def write_frame(self, frame):
+        """Send one frame to the encoder"""
+        if frame.dtype != np.uint8 or not frame.flags.c_contiguous or frame.shape != self.buffer.shape:
+            if frame.shape != self.buffer.shape:
+                raise ValueError(f"Frame of shape {frame.shape} does not match {self.buffer.shape}")
+            np.copyto(self.buffer, frame, casting='unsafe')  # Truncates like astype('uint8')
+            frame = self.buffer
+            self.converted += 1
+        
+        view = memoryview(frame).cast('B')
+        try:
+            while view:
+                view = view[os.write(self.fd, view):]
+        except OSError as e:
+            raise IOError(f"{e}: {self.finish_error()}")
+        self.frames += 1
+    
+    def close(self):
+        """Flush the encoder and wait for it to finish the file"""
+        self.process.stdin.close()
+        self.process.wait()
+        self.stderr_thread.join()
+        if self.process.returncode:
+            raise IOError(f"ffmpeg failed writing {self.path}: {self.stderr.decode('utf8', errors='ignore').strip()}")
+    
+    def kill(self):
+        """Stop the encoder without finishing the file"""
+        self.process.kill()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass  # Broken pipe to the killed encoder
+        self.process.wait()
+        self.stderr_thread.join()
+    
+    def finish_error(self):
+        """Error output of an encoder that stopped reading"""
+        self.process.wait()
+        self.stderr_thread.join()
+        return self.stderr.decode('utf8', errors='ignore').strip()
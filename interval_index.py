@@ -0,0 +1,84 @@
+"""
+Interval Index
+Finds timeline clips overlapping a time range without scanning every clip
+"""
+
+from bisect import bisect_right
+
+class IntervalIndex:
+    """Clips sorted by start time with a max-end segment tree over them"""
+
+    def __init__(self):
+        self.items = []
+        self.starts = []
+        self.tree = [0]  # tree[1] is the root; leaves start at self.size
+        self.size = 1
+        self.dirty = False
+
+    def add(self, item):
+        """Add a clip"""
+        self.items.append(item)
+        self.dirty = True
+
+    def remove(self, item):
+        """Remove a clip"""
+        if item in self.items:
+            self.items.remove(item)
+            self.dirty = True
+
+    def clear(self):
+        """Remove every clip"""
+        self.items = []
+        self.dirty = True
+
+    def invalidate(self):
+        """Mark the index stale after a clip moved or changed length"""
+        self.dirty = True
+
+    def rebuild(self):
+        """Sort clips by start time and rebuild the max-end tree"""
+        self.items.sort(key=lambda item: item.start_time)
+        self.starts = [item.start_time for item in self.items]
+
+        self.size = 1
+        while self.size < len(self.items):
+            self.size *= 2
+        tree = [float('-inf')] * (2 * self.size)
+        for i, item in enumerate(self.items):
+            tree[self.size + i] = item.end_time
+        for node in range(self.size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self.tree = tree
+        self.dirty = False
+
+    def query(self, start, end):
+        """Get clips overlapping start..end in start order, in O((k + 1) log n)"""
+        if self.dirty:
+            self.rebuild()
+
+        # Only clips starting before end can overlap; of those, the tree
+        # skips every subtree whose clips all end before start
+        count = bisect_right(self.starts, end)
+        found = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, lo, width = stack.pop()
+            if lo >= count or self.tree[node] < start:
+                continue
+            if width == 1:
+                found.append(lo)
+                continue
+            half = width // 2
+            stack.append((2 * node + 1, lo + half, half))
+            stack.append((2 * node, lo, half))
+        return [self.items[i] for i in found]
+
+    def at(self, time):
+        """Get clips under a time position"""
+        return self.query(time, time)
+
+    def get_end(self):
+        """Latest end time of all clips"""
+        if self.dirty:
+            self.rebuild()
+        return max(self.tree[1], 0) if self.items else 0
@@ -6,6 +6,7 @@ A comprehensive video editing application
 
 import sys
 import os
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon
@@ -34,5 +35,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Proxy workers in the packaged executable
     main()
 
@@ -0,0 +1,264 @@
+"""
+Media Probe
+Reads container metadata without opening a decoder
+"""
+
+import json
+import os
+import threading
+import ffmpeg
+from app_paths import get_cache_dir, file_cache_key
+
+PROBE_VERSION = 3  # Fallback probes before 3 left keyframe_interval unset
+KEYFRAME_SCAN_SECONDS = 10  # Packets scanned to estimate the keyframe interval
+
+class MediaInfo:
+    """Container metadata for a media file"""
+    
+    FIELDS = ('duration', 'fps', 'width', 'height', 'video_codec', 'pix_fmt',
+              'has_audio', 'audio_codec', 'audio_sample_rate', 'audio_channels',
+              'keyframe_interval')
+    
+    def __init__(self, filepath, **values):
+        self.filepath = filepath
+        self.duration = 0
+        self.fps = 0
+        self.width = 0
+        self.height = 0
+        self.video_codec = None
+        self.pix_fmt = None
+        self.has_audio = False
+        self.audio_codec = None
+        self.audio_sample_rate = None
+        self.audio_channels = None
+        self.keyframe_interval = None
+        for name, value in values.items():
+            if name in self.FIELDS:
+                setattr(self, name, value)
+    
+    @property
+    def resolution(self):
+        """Frame size as (width, height)"""
+        return (self.width, self.height)
+    
+    def to_dict(self):
+        """Convert to dictionary for caching"""
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data['filepath'] = self.filepath
+        return data
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Create from dictionary"""
+        values = dict(data)
+        return cls(values.pop('filepath', None), **values)
+
+_memory_cache = {}
+_lock = threading.Lock()
+
+def probe(filepath):
+    """Get metadata for a media file, from the probe cache when possible"""
+    key = file_cache_key(filepath)  # Size and mtime are part of the key
+    with _lock:
+        info = _memory_cache.get(key)
+    if info is not None:
+        return info
+    
+    cache_path = os.path.join(get_cache_dir('probe'), key + '.json')
+    info = _load_cached(cache_path)
+    if info is None:
+        info = _probe_file(filepath)
+        _save_cached(cache_path, info)
+    
+    with _lock:
+        _memory_cache[key] = info
+    return info
+
+def probe_keyframes(filepath):
+    """Get the times of every keyframe, relative to the first frame"""
+    cache_path = os.path.join(get_cache_dir('probe'), file_cache_key(filepath) + '.keyframes.json')
+    try:
+        with open(cache_path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') == PROBE_VERSION:
+            return data['times']
+    except (OSError, ValueError):
+        pass
+    
+    try:
+        times = _scan_keyframes_ffprobe(filepath)
+    except (ffmpeg.Error, OSError):
+        times = _scan_keyframes_ffmpeg(filepath)
+    times = [t - times[0] for t in times] if times else []
+    
+    temp_path = cache_path + '.tmp'
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump({'version': PROBE_VERSION, 'times': times}, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Error writing probe cache: {e}")
+    return times
+
+def _scan_keyframes_ffprobe(filepath):
+    """Read keyframe times from packet flags; nothing is decoded"""
+    data = ffmpeg.probe(filepath, select_streams='v:0', show_entries='packet=pts_time,flags')
+    return sorted(float(packet['pts_time']) for packet in data.get('packets', [])
+                  if 'K' in packet.get('flags', '') and packet.get('pts_time', 'N/A') != 'N/A')
+
+def _scan_keyframes_ffmpeg(filepath):
+    """Read keyframe times by decoding only the keyframes"""
+    import re
+    _, err = (
+        ffmpeg
+        .input(filepath, skip_frame='nokey')
+        .video
+        .filter('showinfo')
+        .output('-', format='null')
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return sorted(float(t) for t in re.findall(rb'pts_time:\s*([-\d.]+)', err))
+
+def _load_cached(cache_path):
+    """Load a cached probe result"""
+    try:
+        with open(cache_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != PROBE_VERSION:
+        return None
+    return MediaInfo.from_dict(data['info'])
+
+def _save_cached(cache_path, info):
+    """Write a probe result to the cache"""
+    temp_path = cache_path + '.tmp'
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump({'version': PROBE_VERSION, 'info': info.to_dict()}, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Error writing probe cache: {e}")
+
+def _probe_file(filepath):
+    """Read metadata with ffprobe, or ffmpeg's header dump if it is missing"""
+    try:
+        return _probe_ffprobe(filepath)
+    except (ffmpeg.Error, OSError):
+        return _probe_ffmpeg(filepath)
+
+def _parse_rate(rate):
+    """Parse an ffprobe rate such as 30000/1001"""
+    try:
+        num, _, den = (rate or '').partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0
+
+def _probe_ffprobe(filepath):
+    """Read metadata with ffprobe"""
+    data = ffmpeg.probe(filepath)
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if video is None:
+        raise IOError(f"No video stream in {filepath}")
+    
+    info = MediaInfo(filepath)
+    info.duration = float(data.get('format', {}).get('duration') or video.get('duration') or 0)
+    info.fps = _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate'))
+    info.width = int(video.get('width', 0))
+    info.height = int(video.get('height', 0))
+    info.video_codec = video.get('codec_name')
+    info.pix_fmt = video.get('pix_fmt')
+    if audio is not None:
+        info.has_audio = True
+        info.audio_codec = audio.get('codec_name')
+        info.audio_sample_rate = int(audio.get('sample_rate', 0)) or None
+        info.audio_channels = audio.get('channels')
+    info.keyframe_interval = _probe_keyframe_interval(filepath)
+    return info
+
+def _probe_keyframe_interval(filepath):
+    """Estimate the keyframe interval from packet flags; nothing is decoded"""
+    data = ffmpeg.probe(filepath, select_streams='v:0',
+                        show_entries='packet=pts_time,flags',
+                        read_intervals=f'%+{KEYFRAME_SCAN_SECONDS}')
+    times = [float(packet['pts_time']) for packet in data.get('packets', [])
+             if 'K' in packet.get('flags', '') and packet.get('pts_time', 'N/A') != 'N/A']
+    return _median_gap(times)
+
+def _median_gap(times):
+    """Typical distance between keyframe times, None with fewer than two"""
+    if len(times) < 2:
+        return None
+    times = sorted(times)
+    gaps = sorted(b - a for a, b in zip(times, times[1:]))
+    return gaps[len(gaps) // 2]
+
+def _probe_ffmpeg(filepath):
+    """Read metadata from the header ffmpeg prints when opening a file"""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    infos = ffmpeg_parse_infos(filepath)
+    if not infos.get('video_found'):
+        raise IOError(f"No video stream in {filepath}")
+    
+    info = MediaInfo(filepath)
+    info.duration = infos.get('duration') or 0
+    info.fps = infos.get('video_fps') or 0
+    info.width, info.height = infos.get('video_size') or (0, 0)
+    info.has_audio = bool(infos.get('audio_found'))
+    info.audio_sample_rate = infos.get('audio_fps') if info.has_audio else None
+    info.video_codec, info.pix_fmt, info.audio_codec = _parse_stream_codecs(filepath)
+    info.keyframe_interval = _scan_keyframe_interval(filepath)
+    return info
+
+def _scan_keyframe_interval(filepath):
+    """Estimate the keyframe interval from ffmpeg's per-packet checksums; nothing is decoded
+    
+    The framecrc muxer prints one line per copied packet and marks every
+    packet that is not a keyframe with F=0x0.
+    """
+    import re
+    import subprocess
+    from moviepy.config import get_setting
+    try:
+        result = subprocess.run([get_setting("FFMPEG_BINARY"), '-hide_banner', '-loglevel', 'error',
+                                 '-t', str(KEYFRAME_SCAN_SECONDS), '-i', filepath,
+                                 '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-'],
+                                capture_output=True)
+    except OSError:
+        return None
+    lines = result.stdout.decode('utf8', errors='ignore').splitlines()
+    timebase = next((re.match(r'#tb 0: (\d+)/(\d+)', line) for line in lines
+                     if line.startswith('#tb 0:')), None)
+    if timebase is None:
+        return None
+    scale = int(timebase.group(1)) / int(timebase.group(2))
+    times = []
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        fields = [field.strip() for field in line.split(',')]
+        if len(fields) < 6:
+            continue
+        flags = next((field[2:] for field in fields[6:] if field.startswith('F=')), '0x1')
+        if int(flags, 16) & 1:
+            times.append(int(fields[2]) * scale)
+    return _median_gap(times)
+
+def _parse_stream_codecs(filepath):
+    """Read video codec, pixel format and audio codec from ffmpeg's stream lines"""
+    import re
+    import subprocess
+    from moviepy.config import get_setting
+    try:
+        result = subprocess.run([get_setting("FFMPEG_BINARY"), '-hide_banner', '-i', filepath],
+                                capture_output=True)
+    except OSError:
+        return None, None, None
+    header = result.stderr.decode('utf8', errors='ignore')
+    video = re.search(r'Stream #.*?: Video: (\w+)[^,]*, (\w+)', header)
+    audio = re.search(r'Stream #.*?: Audio: (\w+)', header)
+    return (video.group(1) if video else None, video.group(2) if video else None,
+            audio.group(1) if audio else None)
@@ -0,0 +1,190 @@
+"""
+Parallel Export
+Renders independent timeline segments in worker processes and joins them
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+import os
+import shutil
+import tempfile
+from time import perf_counter
+import numpy as np
+from moviepy.video.compositing.concatenate import concatenate_videoclips
+from media_probe import probe_keyframes
+from smart_render import AUDIO_RATE, CANCEL_POLL, get_frame_times, render_frames, join_parts
+
+SEGMENT_LENGTH = 10.0  # Seconds of output per segment
+
+_cancel_event = None  # Set in each worker process by init_worker
+
+def init_worker(cancel_event, threads):
+    """Keep the shared cancel event and size effect strips to the worker's
+    share of the cores; runs once in each worker process"""
+    from tiled_executor import set_tiled_workers
+    global _cancel_event
+    _cancel_event = cancel_event
+    set_tiled_workers(threads)
+
+def render_segment(clip_data, local_times, fps, options, path, threads):
+    """Render part of one clip from its saved state; runs in a worker process
+    
+    Returns the seconds the worker spent per stage.
+    """
+    from clip import VideoClip
+    from export_progress import ProgressTracker
+    progress = ProgressTracker(cancel_event=_cancel_event)
+    progress.check_cancelled()  # Queued before the export was cancelled
+    clip = VideoClip.from_dict(clip_data)
+    try:
+        processed = clip.get_clip(progress)
+        if processed is None:
+            raise ValueError(f"Could not load {clip_data['filepath']}")
+        
+        # A freshly seeked reader can return the frame after the one asked
+        # for; reading the previous frame first leaves it decoding in order
+        reader = clip.video_clip.reader
+        first = clip.trim_start + local_times[0]
+        if first >= 1.0 / reader.fps:
+            reader.get_frame(first - 1.0 / reader.fps)
+        render_frames(processed, local_times, fps, path, options, threads, progress)
+    finally:
+        clip.close()
+    return progress.snapshot(finished=True).stage_times
+
+class ExportSegment:
+    """A run of output frames taken from one clip"""
+    
+    def __init__(self, clip, local_times):
+        self.clip = clip
+        self.local_times = local_times  # Clip times of each output frame
+    
+    @property
+    def count(self):
+        """Number of output frames"""
+        return len(self.local_times)
+
+class ParallelExporter:
+    """Splits the timeline at clip and keyframe boundaries and renders segments in a process pool
+    
+    Every segment samples exactly the frames a single render would, and the
+    encoded parts are joined without re-encoding, so the result only differs
+    from a serial export by where the encoder placed its keyframes.
+    """
+    
+    def __init__(self, settings, workers=None, segment_length=SEGMENT_LENGTH):
+        self.settings = settings
+        self.fps = settings.get('fps', 30)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.segment_length = segment_length
+    
+    def render(self, clips, output_path, progress):
+        """Export clips using all workers"""
+        loaded = [(clip, clip.get_clip()) for clip in clips]
+        loaded = [(clip, processed) for clip, processed in loaded if processed is not None]
+        if not loaded:
+            raise ValueError("No valid clips to export")
+        clips, processed = zip(*loaded)
+        
+        segments = self.plan(clips, processed)
+        progress.begin(sum(segment.count for segment in segments), self.fps)
+        
+        # Workers share the machine, so x264 and effect strips get an equal
+        # share of the cores
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        options = {
+            'vcodec': self.settings.get('codec', 'libx264'),
+            'video_bitrate': self.settings.get('bitrate'),
+            'preset': self.settings.get('preset', 'medium'),
+            'backend': self.settings.get('backend', 'moviepy')
+        }
+        
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        workdir = tempfile.mkdtemp(prefix='parallel_export_', dir=output_dir)
+        try:
+            parts = [(os.path.join(workdir, f'{i:05d}.mp4'), segment.count) for i, segment in enumerate(segments)]
+            # Spawned workers open their own readers; forked ones would
+            # inherit the pipes of this process's decoders
+            context = multiprocessing.get_context('spawn')
+            cancel_event = context.Event()
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                     initializer=init_worker, initargs=(cancel_event, threads)) as executor:
+                futures = {
+                    executor.submit(render_segment, segment.clip.to_dict(), segment.local_times,
+                                    self.fps, options, path, threads): segment
+                    for segment, (path, _) in zip(segments, parts)
+                }
+                try:
+                    # Audio is mixed here while the workers render video
+                    start = perf_counter()
+                    audio_path = self.write_audio(processed, workdir, progress)
+                    progress.add_time('audio', perf_counter() - start)
+                    pending = set(futures)
+                    while pending:
+                        done, pending = wait(pending, timeout=CANCEL_POLL, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            # Stage times add up across workers, like CPU time
+                            for stage, seconds in future.result().items():
+                                progress.add_time(stage, seconds)
+                            progress.advance(futures[future].count)
+                        progress.check_cancelled()
+                except BaseException:
+                    # Running workers stop at their next frame
+                    cancel_event.set()
+                    for future in futures:
+                        future.cancel()
+                    raise
+            
+            join_parts(parts, self.fps, audio_path, output_path, workdir, progress)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return segments
+    
+    def plan(self, clips, processed):
+        """Split each clip's output frames into segments of about segment_length"""
+        max_frames = max(1, int(round(self.segment_length * self.fps)))
+        segments = []
+        frame_times = get_frame_times([p.duration for p in processed], self.fps)
+        for clip, local_times in zip(clips, frame_times):
+            bounds = self.get_split_frames(clip, local_times, max_frames)
+            for start, end in zip([0] + bounds, bounds + [len(local_times)]):
+                if end > start:
+                    segments.append(ExportSegment(clip, local_times[start:end]))
+        return segments
+    
+    def get_split_frames(self, clip, local_times, max_frames):
+        """Output frames to split a clip at, moved onto source keyframes where close"""
+        count = len(local_times)
+        if count <= max_frames:
+            return []
+        
+        # Output frames at which a source keyframe is shown
+        try:
+            keyframes = np.array(probe_keyframes(clip.filepath))
+        except Exception as e:
+            print(f"Error reading keyframes: {e}")
+            keyframes = np.array([])
+        keyframe_times = keyframes - clip.trim_start
+        keyframe_frames = np.unique(np.searchsorted(local_times, keyframe_times - 1e-6))
+        keyframe_frames = keyframe_frames[(keyframe_frames > 0) & (keyframe_frames < count)]
+        
+        bounds = []
+        for target in range(max_frames, count, max_frames):
+            split = target
+            if len(keyframe_frames):
+                nearest = keyframe_frames[np.argmin(np.abs(keyframe_frames - target))]
+                if abs(nearest - target) <= max_frames // 2:
+                    split = int(nearest)
+            if split > (bounds[-1] if bounds else 0):
+                bounds.append(split)
+        return bounds
+    
+    def write_audio(self, processed, workdir, progress):
+        """Mix the timeline audio the way the full render would; None if silent"""
+        if not any(p.audio is not None for p in processed):
+            return None
+        audio_path = os.path.join(workdir, 'audio.m4a')
+        audio = concatenate_videoclips(list(processed), method="compose").audio
+        audio.write_audiofile(audio_path, fps=AUDIO_RATE, codec='aac', bitrate='192k',
+                              logger=progress.get_logger())
+        return audio_path
@@ -0,0 +1,79 @@
+"""
+Playback Clock
+Derives the playback position from a monotonic clock
+"""
+
+import time
+
+class PlaybackClock:
+    """Maps wall-clock time to source frames, dropping frames when behind"""
+    
+    def __init__(self, fps=30, clock=time.monotonic):
+        self.fps = fps
+        self.clock = clock
+        self.running = False
+        self.origin_time = 0  # Clock reading when position was origin_position
+        self.origin_position = 0
+        self.last_frame = None
+        self.stats = {'presented': 0, 'dropped': 0, 'late': 0}
+    
+    def set_fps(self, fps):
+        """Change the frame rate, keeping the current position"""
+        position = self.get_position()
+        self.fps = fps or 30
+        self.seek(position)
+    
+    def start(self, position):
+        """Start running from a position"""
+        self.running = True
+        self.seek(position)
+    
+    def pause(self):
+        """Freeze the position"""
+        self.origin_position = self.get_position()
+        self.running = False
+    
+    def seek(self, position):
+        """Jump to a position; the next frame is presented without counting drops"""
+        self.origin_time = self.clock()
+        self.origin_position = position
+        self.last_frame = None
+    
+    def get_position(self):
+        """Current position in seconds"""
+        if not self.running:
+            return self.origin_position
+        return self.origin_position + (self.clock() - self.origin_time)
+    
+    def get_timer_interval(self):
+        """Timer period in ms; polling at twice the frame rate keeps pacing within half a frame"""
+        return max(1, int(1000 / (self.fps * 2)))
+    
+    def get_frame_time(self, frame):
+        """Position of a frame in seconds"""
+        return frame / float(self.fps)
+    
+    def get_due_time(self, frame):
+        """Clock reading at which a frame should be on screen"""
+        return self.origin_time + self.get_frame_time(frame) - self.origin_position
+    
+    def next_frame(self):
+        """Get the frame to present now, or None while the last one is current"""
+        frame = int(self.get_position() * self.fps + 1e-6)  # Guard against float error
+        if frame == self.last_frame:
+            return None
+        if self.last_frame is not None and frame > self.last_frame + 1:
+            # Fell behind: skip straight to the frame that is due
+            self.stats['dropped'] += frame - self.last_frame - 1
+        self.last_frame = frame
+        return frame
+    
+    def frame_presented(self, frame):
+        """Record a presented frame; it is late if it was shown after the next one was due"""
+        self.stats['presented'] += 1
+        if self.clock() > self.get_due_time(frame + 1):
+            self.stats['late'] += 1
+    
+    def reset_stats(self):
+        """Zero the frame counters"""
+        self.stats = {'presented': 0, 'dropped': 0, 'late': 0}
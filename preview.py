@@ -8,6 +8,9 @@ from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QImage, QPixmap
 import cv2
 import numpy as np
+from frame_cache import FrameCache
+from preview_decoder import FrameReader, ReadAheadDecoder, frame_to_image
+from proxy_manager import get_proxy_manager
 
 class PreviewWidget(QWidget):
     """Video preview widget"""
@@ -17,7 +20,8 @@ class PreviewWidget(QWidget):
         self.current_clip = None
         self.current_frame = None
         self.position = 0
-        self.cap = None
+        self.decoder = None
+        self.frame_cache = FrameCache()
         
         self.init_ui()
         
@@ -35,13 +39,29 @@ class PreviewWidget(QWidget):
     def set_clip(self, clip):
         """Set the clip to preview"""
         self.current_clip = clip
+        self.stop_decoder()
         if clip and clip.filepath:
             try:
-                self.cap = cv2.VideoCapture(clip.filepath)
+                proxy = get_proxy_manager().find_proxy(clip.filepath)
+                if proxy:
+                    # Proxies are intra-only, so every seek is cheap
+                    reader = FrameReader(proxy, keyframe_interval=0)
+                else:
+                    info = getattr(clip, 'info', None)
+                    reader = FrameReader(clip.filepath, info.keyframe_interval if info else None)
+                self.decoder = ReadAheadDecoder(reader)
+                self.decoder.frame_ready.connect(self.on_frame_ready)
+                self.decoder.start()
                 self.update_frame()
             except Exception as e:
                 print(f"Error opening video: {e}")
-                self.cap = None
+                self.decoder = None
+    
+    def stop_decoder(self):
+        """Stop the read-ahead decoder of the current clip"""
+        if self.decoder:
+            self.decoder.stop()
+            self.decoder = None
     
     def set_position(self, position):
         """Set preview position"""
@@ -50,7 +70,7 @@ class PreviewWidget(QWidget):
     
     def update_frame(self):
         """Update the preview frame"""
-        if not self.cap or not self.current_clip:
+        if not self.decoder or not self.current_clip:
             return
         
         # Calculate frame position
@@ -58,44 +78,64 @@ class PreviewWidget(QWidget):
         if clip_position < 0 or clip_position >= self.current_clip.duration:
             return
         
-        # Seek to position
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        frame_number = int(clip_position * fps)
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        source_position = self.current_clip.trim_start + clip_position
+        frame_number = int(source_position * self.decoder.reader.fps + 1e-6)  # Guard against float error
+        resolution = self.get_preview_size()
+        filepath = self.decoder.reader.filepath  # Proxy frames are cached separately
+        
+        # Scrubbing back over a region or tweaking a paused frame hits the cache
+        frame = self.frame_cache.get(filepath, frame_number, resolution)
+        if frame is not None:
+            self.show_frame(frame, frame_to_image(frame))
+            return
         
-        # Read frame
-        ret, frame = self.cap.read()
-        if ret:
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Resize to fit preview
-            height, width = frame_rgb.shape[:2]
-            preview_width = self.preview_label.width()
-            preview_height = self.preview_label.height()
-            
-            if preview_width > 0 and preview_height > 0:
-                scale = min(preview_width / width, preview_height / height)
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-                frame_resized = cv2.resize(frame_rgb, (new_width, new_height))
-            else:
-                frame_resized = frame_rgb
-            
-            # Convert to QPixmap
-            h, w, ch = frame_resized.shape
-            bytes_per_line = ch * w
-            q_image = QImage(frame_resized.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_image)
-            
-            self.preview_label.setPixmap(pixmap)
-            self.current_frame = frame_resized
+        # Decoding happens on the worker thread; if the frame isn't ready yet
+        # on_frame_ready calls back once it is
+        ready = self.decoder.take(frame_number, resolution)
+        if ready:
+            frame, image = ready
+            self.frame_cache.put(filepath, frame_number, resolution, frame)
+            self.show_frame(frame, image)
+    
+    def on_frame_ready(self, frame_number):
+        """Show a frame the read-ahead decoder just finished"""
+        self.update_frame()
+    
+    def show_frame(self, frame, image):
+        """Display a decoded frame"""
+        self.preview_label.setPixmap(QPixmap.fromImage(image))
+        self.current_frame = frame
+    
+    def get_preview_size(self):
+        """Get the size frames are scaled to for the preview label"""
+        width = self.decoder.reader.width
+        height = self.decoder.reader.height
+        preview_width = self.preview_label.width()
+        preview_height = self.preview_label.height()
+        
+        if preview_width > 0 and preview_height > 0 and width > 0 and height > 0:
+            scale = min(preview_width / width, preview_height / height)
+            return (int(width * scale), int(height * scale))
+        return (width, height)
+    
+    @property
+    def decode_stats(self):
+        """Get decoder counters"""
+        if not self.decoder:
+            return {}
+        return self.decoder.stats()
+    
+    def set_cache_budget(self, max_bytes):
+        """Set the memory budget of the decoded frame cache"""
+        self.frame_cache.set_budget(max_bytes)
+    
+    def cache_stats(self):
+        """Get frame cache hit/miss counters"""
+        return self.frame_cache.stats()
     
     def clear(self):
         """Clear preview"""
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        self.stop_decoder()
         self.current_clip = None
         self.preview_label.clear()
         self.preview_label.setText("No video loaded")
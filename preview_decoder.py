@@ -0,0 +1,167 @@
+"""
+Preview Decoder
+Decodes preview frames ahead of the playhead on a worker thread
+"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+from collections import deque
+import threading
+import cv2
+
+class FrameReader:
+    """Reads scaled RGB frames from a file, reading on instead of seeking when possible"""
+    
+    def __init__(self, filepath, keyframe_interval=None):
+        self.filepath = filepath
+        self.cap = cv2.VideoCapture(filepath)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.keyframe_interval = 1.0 if keyframe_interval is None else keyframe_interval
+        self.next_frame = 0  # Frame the capture will return on its next read
+        self.stats = {'sequential': 0, 'seeks': 0, 'dropped': 0}
+    
+    def is_open(self):
+        """Check whether the file could be opened"""
+        return self.cap.isOpened()
+    
+    def release(self):
+        """Close the capture"""
+        self.cap.release()
+    
+    def get_max_skip_frames(self):
+        """Largest forward gap that is read through instead of seeking"""
+        return max(1, int(self.keyframe_interval * self.fps))
+    
+    def read(self, frame_number, resolution):
+        """Decode a frame and scale it to resolution"""
+        gap = frame_number - self.next_frame
+        if gap == 0:
+            # Playback: the frame we want is simply the next one
+            self.stats['sequential'] += 1
+        elif 0 < gap <= self.get_max_skip_frames():
+            # Playback fell behind: grab the late frames without converting
+            # or scaling them, which is cheaper than a seek back to the
+            # keyframe before the target
+            for _ in range(gap):
+                if not self.cap.grab():
+                    break
+            self.stats['dropped'] += gap
+        else:
+            # A real jump, seek to position
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            self.stats['seeks'] += 1
+        
+        ret, frame = self.cap.read()
+        if not ret:
+            self.next_frame = -1  # Unknown, seek next time
+            return None
+        self.next_frame = frame_number + 1
+        
+        # Convert BGR to RGB and resize to fit preview
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = frame_rgb.shape[:2]
+        if resolution != (width, height) and resolution[0] > 0 and resolution[1] > 0:
+            return cv2.resize(frame_rgb, resolution)
+        return frame_rgb
+
+def frame_to_image(frame):
+    """Wrap an RGB frame in a QImage; the frame must outlive the image"""
+    h, w, ch = frame.shape
+    return QImage(frame.data, w, h, ch * w, QImage.Format.Format_RGB888)
+
+class ReadAheadDecoder(QThread):
+    """Decodes frames ahead of the playhead into a bounded ring buffer"""
+    
+    frame_ready = pyqtSignal(int)  # Frame number the GUI is waiting for
+    
+    def __init__(self, reader, capacity=8):
+        super().__init__()
+        self.reader = reader
+        self.capacity = capacity
+        self.ring = deque()  # (frame_number, frame, image) in frame order
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.target = None  # Next frame to decode, None when idle
+        self.resolution = (0, 0)
+        self.wanted = None
+        self.stopping = False
+    
+    def take(self, frame_number, resolution):
+        """Get a buffered (frame, image) pair, or None while it is decoded"""
+        with self.condition:
+            if resolution != self.resolution:
+                self.resolution = resolution
+                self.flush(frame_number)
+                return None
+            
+            # Frames before the playhead are late, drop them
+            while self.ring and self.ring[0][0] < frame_number:
+                self.ring.popleft()
+            self.condition.notify_all()  # Dropping frames made room
+            if self.ring and self.ring[0][0] == frame_number:
+                _, frame, image = self.ring.popleft()
+                return frame, image
+            
+            self.wanted = frame_number
+            if not self.ring and self.target == frame_number:
+                return None  # Being decoded right now
+            
+            # Anything else is a jump: flush and restart the read-ahead;
+            # frame_ready fires once the frame is decoded. Forward jumps stay
+            # cheap because the reader reads through short gaps
+            self.flush(frame_number)
+            return None
+    
+    def flush(self, frame_number):
+        """Drop buffered frames and restart decoding at frame_number"""
+        with self.condition:
+            self.generation += 1
+            self.ring.clear()
+            self.target = frame_number
+            self.wanted = frame_number
+            self.condition.notify_all()
+    
+    def stop(self):
+        """Stop the worker and wait for it to finish"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.wait()
+        self.reader.release()
+    
+    def stats(self):
+        """Get decode counters"""
+        with self.condition:
+            stats = dict(self.reader.stats)
+            stats['buffered'] = len(self.ring)
+            return stats
+    
+    def run(self):
+        """Decode ahead until the ring is full, then wait for room"""
+        while True:
+            with self.condition:
+                while not self.stopping and (self.target is None or len(self.ring) >= self.capacity):
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                generation = self.generation
+                frame_number = self.target
+                resolution = self.resolution
+            
+            # Decode, convert and scale outside the lock
+            frame = self.reader.read(frame_number, resolution)
+            image = frame_to_image(frame) if frame is not None else None
+            
+            with self.condition:
+                if generation != self.generation:
+                    continue  # Flushed while decoding
+                if frame is None:
+                    self.target = None  # End of file
+                    continue
+                self.ring.append((frame_number, frame, image))
+                self.target = frame_number + 1
+                notify = frame_number == self.wanted
+            if notify:
+                self.frame_ready.emit(frame_number)
@@ -0,0 +1,141 @@
+"""
+Proxy Manager
+Creates low resolution editing proxies of imported media
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import ffmpeg
+from app_paths import get_cache_dir, file_cache_key
+
+PROXY_HEIGHT = 540
+
+# Proxy states
+NONE = 'none'
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+NOT_NEEDED = 'not needed'  # Source is already small enough
+
+def transcode_proxy(source, target, height=PROXY_HEIGHT):
+    """Transcode source into an intra-only proxy; runs in a worker process"""
+    temp_path = target + '.part.mp4'
+    try:
+        (
+            ffmpeg
+            .input(source)
+            .output(temp_path, vf=f'scale=-2:{height}', vcodec='libx264',
+                    preset='ultrafast', crf=23, g=1, pix_fmt='yuv420p',
+                    acodec='aac', audio_bitrate='128k')
+            .overwrite_output()
+            .run(quiet=True)
+        )
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return target
+
+class ProxyManager:
+    """Tracks proxy files and transcodes missing ones in a process pool"""
+    
+    def __init__(self, max_workers=None, height=PROXY_HEIGHT):
+        self.height = height
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.executor = None  # Started on the first request
+        self.status = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+    
+    def get_proxy_path(self, filepath):
+        """Location of the proxy for a source file"""
+        name = f"{file_cache_key(filepath)}_{self.height}p.mp4"
+        return os.path.join(get_cache_dir('proxies'), name)
+    
+    def find_proxy(self, filepath):
+        """Get the proxy path if the proxy exists"""
+        try:
+            path = self.get_proxy_path(filepath)
+        except OSError:
+            return None
+        return path if os.path.exists(path) else None
+    
+    def resolve(self, filepath):
+        """File to decode for previews: the proxy when ready, else the original"""
+        return self.find_proxy(filepath) or filepath
+    
+    def get_status(self, filepath):
+        """Get the proxy state of a source file"""
+        with self.lock:
+            status = self.status.get(filepath)
+        if status in (PENDING, FAILED, NOT_NEEDED):
+            return status
+        return READY if self.find_proxy(filepath) else NONE
+    
+    def request(self, filepath):
+        """Start building a proxy in the background if one is needed"""
+        if self.get_status(filepath) != NONE:
+            return
+        
+        from media_probe import probe
+        try:
+            info = probe(filepath)
+            target = self.get_proxy_path(filepath)
+        except Exception as e:
+            print(f"Error probing media for proxy: {e}")
+            self.set_status(filepath, FAILED)
+            return
+        if info.height and info.height <= self.height:
+            self.set_status(filepath, NOT_NEEDED)
+            return
+        
+        with self.lock:
+            if self.executor is None:
+                # Spawned workers start clean; forked ones would inherit the
+                # Qt threads and the pipes of this process's decoders
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            future = self.executor.submit(transcode_proxy, filepath, target, self.height)
+        self.set_status(filepath, PENDING)
+        future.add_done_callback(lambda f: self.on_done(filepath, f))
+    
+    def on_done(self, filepath, future):
+        """Record the result of a transcode"""
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error creating proxy for {filepath}: {e}")
+            self.set_status(filepath, FAILED)
+            return
+        self.set_status(filepath, READY)
+    
+    def set_status(self, filepath, status):
+        """Update a proxy state and tell listeners"""
+        with self.lock:
+            self.status[filepath] = status
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(filepath, status)
+    
+    def add_listener(self, listener):
+        """Call listener(filepath, status) on changes, from any thread"""
+        with self.lock:
+            self.listeners.append(listener)
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+_manager = None
+
+def get_proxy_manager():
+    """Get the application-wide proxy manager"""
+    global _manager
+    if _manager is None:
+        _manager = ProxyManager()
+    return _manager
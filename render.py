@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Render
+Exports a saved project from the command line without loading the GUI
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+from export_manager import QUALITIES, BACKENDS
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1  # The render itself failed
+EXIT_USAGE = 2  # Bad arguments, as reported by argparse
+EXIT_PROJECT = 3  # The project or its media could not be loaded
+EXIT_CANCELLED = 130  # Interrupted by Ctrl+C or SIGTERM
+
+PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+           'medium', 'slow', 'slower', 'veryslow']
+
+class ProjectError(Exception):
+    """Raised when a project cannot be rendered as saved"""
+
+def load_clips(project_path):
+    """Rebuild the timeline clips of a .vep project"""
+    from project_manager import ProjectManager
+    from clip import VideoClip
+    try:
+        data = ProjectManager().load(project_path)
+        clips = [VideoClip.from_dict(clip_data) for clip_data in data.get('clips', [])]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ProjectError(f"Cannot read project: {e}")
+    
+    missing = [clip.filepath for clip in clips if not clip.loaded]
+    if missing or not clips:
+        for clip in clips:
+            clip.close()
+        raise ProjectError(f"Cannot load media: {', '.join(missing)}" if missing else "Project has no clips")
+    return clips
+
+def emit(out, event, **fields):
+    """Write one JSON progress line"""
+    out.write(json.dumps(dict(event=event, **fields)) + '\n')
+    out.flush()
+
+def on_terminate(signum, frame):
+    """Treat SIGTERM like Ctrl+C so the export cleans up"""
+    raise KeyboardInterrupt
+
+def main(argv=None):
+    """Render entry point; returns the exit code"""
+    parser = argparse.ArgumentParser(description="Render a video editor project")
+    parser.add_argument('project', help=".vep project file")
+    parser.add_argument('output', help="video file to write")
+    parser.add_argument('--quality', choices=QUALITIES, default='high')
+    parser.add_argument('--preset', choices=PRESETS, help="x264 preset, overriding the quality's")
+    parser.add_argument('--backend', choices=BACKENDS, default='moviepy',
+                        help="encoder for rendered frames; pipe streams raw frames to ffmpeg")
+    parser.add_argument('--smart-render', action='store_true',
+                        help="stream-copy untouched footage where possible")
+    parser.add_argument('--workers', type=int, default=1, help="render segments in this many processes")
+    parser.add_argument('--segment-length', type=float, help="seconds per parallel segment")
+    parser.add_argument('--progress-log', help="also append progress as JSON lines to this file")
+    parser.add_argument('--quiet', action='store_true', help="only print the final result")
+    args = parser.parse_args(argv)
+    
+    # stdout carries JSON lines only; anything else the export prints goes to stderr
+    out = sys.stdout
+    signal.signal(signal.SIGTERM, on_terminate)
+    with contextlib.redirect_stdout(sys.stderr):
+        clips = []
+        try:
+            clips = load_clips(args.project)
+            
+            from export_manager import ExportManager
+            callback = None
+            if not args.quiet:
+                callback = lambda progress: emit(out, 'progress', **progress.to_dict())
+            options = {}
+            if args.segment_length:
+                options['segment_length'] = args.segment_length
+            progress = ExportManager().export(
+                clips, args.output, callback, quality=args.quality, smart_render=args.smart_render,
+                workers=args.workers, progress_log=args.progress_log, preset=args.preset,
+                backend=args.backend, **options)
+            emit(out, 'done', output=os.path.abspath(args.output), **progress.to_dict())
+            return EXIT_OK
+        except ProjectError as e:
+            emit(out, 'error', message=str(e))
+            return EXIT_PROJECT
+        except KeyboardInterrupt:
+            emit(out, 'cancelled')
+            return EXIT_CANCELLED
+        except Exception as e:
+            emit(out, 'error', message=str(e))
+            return EXIT_FAILED
+        finally:
+            for clip in clips:
+                clip.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
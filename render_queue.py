@@ -0,0 +1,435 @@
+"""
+Render Queue
+Persistent batch export of saved projects in background processes
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from app_paths import get_data_dir, get_cache_dir
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30.0  # Seconds before the first retry, doubling after each failure
+POLL_INTERVAL = 0.5  # Seconds between scheduler passes
+STOP_TIMEOUT = 10.0  # Seconds to wait for a cancelled render to exit
+
+# Memory estimate per render process
+PROCESS_MEMORY = 300 * 1024 * 1024  # Interpreter, moviepy and the ffmpeg processes
+FRAME_BUFFERS = 64  # Frames held by decoders, effects and the encoder lookahead
+MEMORY_FRACTION = 0.75  # Share of physical memory the queue may use
+DEFAULT_MEMORY_BUDGET = 4 * 1024 * 1024 * 1024  # When physical memory is unknown
+
+def get_physical_memory():
+    """Total physical memory in bytes, None if unknown"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def estimate_memory(project_path, workers=1):
+    """Rough peak memory of rendering a project with this many worker processes"""
+    from project_manager import ProjectManager
+    from media_probe import probe
+    width, height = 1920, 1080
+    try:
+        data = ProjectManager().load(project_path)
+        sizes = [probe(clip['filepath']) for clip in data.get('clips', [])]
+        if sizes:
+            width = max(info.width for info in sizes)
+            height = max(info.height for info in sizes)
+    except Exception as e:
+        print(f"Error estimating render memory: {e}")
+    return max(1, workers) * (PROCESS_MEMORY + FRAME_BUFFERS * width * height * 3)
+
+class RenderJob:
+    """An export of a saved project"""
+    
+    FIELDS = ('id', 'project_path', 'output_path', 'quality', 'preset', 'priority', 'smart_render',
+              'workers', 'memory', 'status', 'attempts', 'max_attempts', 'next_attempt', 'error',
+              'progress', 'created', 'started', 'finished')
+    
+    def __init__(self, project_path, output_path, quality='high', preset=None, priority=0,
+                 smart_render=True, workers=1, memory=0, max_attempts=MAX_ATTEMPTS):
+        self.id = uuid.uuid4().hex[:12]
+        self.project_path = os.path.abspath(project_path)
+        self.output_path = os.path.abspath(output_path)
+        self.quality = quality  # A get_codec_settings quality
+        self.preset = preset  # Overrides the quality's x264 preset
+        self.priority = priority  # Higher runs first
+        self.smart_render = smart_render
+        self.workers = workers  # Processes the export renders in, and cores it is charged
+        self.memory = memory  # Estimated peak bytes
+        self.status = QUEUED
+        self.attempts = 0
+        self.max_attempts = max_attempts
+        self.next_attempt = 0.0  # Wall clock time a retry may start
+        self.error = None
+        self.progress = None  # Latest ExportProgress.to_dict()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+    
+    def describe(self):
+        """Short status text"""
+        if self.status == RUNNING and self.progress:
+            return f"{self.progress['percent']}%"
+        if self.status == QUEUED and self.attempts:
+            return f"retry {self.attempts + 1}/{self.max_attempts}"
+        if self.status == FAILED and self.error:
+            return f"failed: {self.error}"
+        return self.status
+    
+    def to_dict(self):
+        """Serialize job"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Create job from dictionary"""
+        job = cls(data['project_path'], data['output_path'])
+        for field in cls.FIELDS:
+            if field in data:
+                setattr(job, field, data[field])
+        return job
+
+def run_job(job_data, events, cancel_event, cores=None):
+    """Export one job and report through the events queue; runs in its own process
+    
+    cores is what the queue charged the job; effect strips stay within it.
+    Parallel export workers size their own strips.
+    """
+    from render import load_clips, ProjectError
+    from export_manager import ExportManager
+    from export_progress import ExportCancelled
+    from tiled_executor import set_tiled_workers
+    job = RenderJob.from_dict(job_data)
+    if cores:
+        set_tiled_workers(max(1, cores // max(1, job.workers)))
+    log_path = os.path.join(get_cache_dir('logs', 'queue'), f'{job.id}.jsonl')
+    clips = []
+    try:
+        clips = load_clips(job.project_path)
+        progress = ExportManager().export(
+            clips, job.output_path, lambda progress: events.put((job.id, 'progress', progress.to_dict())),
+            quality=job.quality, preset=job.preset, smart_render=job.smart_render, workers=job.workers,
+            progress_log=log_path, cancel_event=cancel_event)
+        events.put((job.id, 'done', progress.to_dict()))
+    except ExportCancelled:
+        events.put((job.id, 'cancelled', None))
+    except ProjectError as e:
+        events.put((job.id, 'failed', (str(e), False)))  # Retrying won't bring the media back
+    except Exception as e:
+        if cancel_event.is_set():
+            events.put((job.id, 'cancelled', None))  # Cancelling can surface as a broken pipe
+        else:
+            events.put((job.id, 'failed', (str(e), True)))
+    finally:
+        for clip in clips:
+            clip.close()
+
+class RunningJob:
+    """A job's render process"""
+    
+    def __init__(self, process, cancel_event):
+        self.process = process
+        self.cancel_event = cancel_event
+
+class RenderQueue:
+    """Runs queued exports by priority within CPU and memory budgets
+    
+    Jobs are kept in a JSON file, so the queue survives restarts: jobs that
+    were running when the application stopped are queued again. Each job
+    renders in its own process. Jobs start in priority order as long as
+    their cores and estimated memory fit in what running jobs leave free;
+    a job that does not fit holds back the jobs after it, and a job larger
+    than the whole budget runs alone. Failed jobs are retried with a
+    growing delay.
+    """
+    
+    def __init__(self, store_path=None, cpu_budget=None, memory_budget=None):
+        self.store_path = store_path or os.path.join(get_data_dir('queue'), 'jobs.json')
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        physical = get_physical_memory()
+        self.memory_budget = memory_budget or (int(physical * MEMORY_FRACTION) if physical
+                                               else DEFAULT_MEMORY_BUDGET)
+        self.jobs = []
+        self.running = {}  # Job id -> RunningJob
+        self.listeners = []
+        self.lock = threading.RLock()
+        self.context = multiprocessing.get_context('spawn')
+        self.events = self.context.Queue()
+        self.thread = None
+        self.stopping = threading.Event()
+        self.load()
+    
+    def load(self):
+        """Read the job store"""
+        try:
+            with open(self.store_path, 'r') as f:
+                data = json.load(f)
+            self.jobs = [RenderJob.from_dict(job_data) for job_data in data.get('jobs', [])]
+        except FileNotFoundError:
+            self.jobs = []
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading render queue: {e}")
+            self.jobs = []
+        for job in self.jobs:
+            if job.status == RUNNING:
+                job.status = QUEUED  # Interrupted by the last shutdown
+                job.progress = None
+    
+    def save(self):
+        """Write the job store"""
+        with self.lock:
+            data = {'jobs': [job.to_dict() for job in self.jobs]}
+        temp_path = self.store_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, self.store_path)
+        except OSError as e:
+            print(f"Error saving render queue: {e}")
+    
+    def add_job(self, project_path, output_path, quality='high', preset=None, priority=0,
+                smart_render=True, workers=1, max_attempts=MAX_ATTEMPTS):
+        """Queue an export of a .vep project"""
+        from export_manager import QUALITIES
+        if quality not in QUALITIES:
+            raise ValueError(f"Unknown quality: {quality}")
+        job = RenderJob(project_path, output_path, quality, preset, priority, smart_render,
+                        workers, estimate_memory(project_path, workers), max_attempts)
+        with self.lock:
+            self.jobs.append(job)
+        self.changed(job)
+        return job
+    
+    def get_job(self, job_id):
+        """Find a job by id"""
+        with self.lock:
+            for job in self.jobs:
+                if job.id == job_id:
+                    return job
+        return None
+    
+    def get_jobs(self):
+        """All jobs in the order they will run"""
+        with self.lock:
+            return sorted(self.jobs, key=lambda job: (-job.priority, job.created))
+    
+    def set_priority(self, job_id, priority):
+        """Change the priority of a job"""
+        job = self.get_job(job_id)
+        if job:
+            job.priority = priority
+            self.changed(job)
+    
+    def cancel(self, job_id):
+        """Stop a job; a running render removes its partial output"""
+        with self.lock:
+            job = self.get_job(job_id)
+            if job is None or job.status not in (QUEUED, RUNNING):
+                return
+            running = self.running.get(job_id)
+            if running:
+                running.cancel_event.set()  # Reported back as cancelled
+                return
+            job.status = CANCELLED
+        self.changed(job)
+    
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again"""
+        with self.lock:
+            job = self.get_job(job_id)
+            if job is None or job.status not in (FAILED, CANCELLED):
+                return
+            job.status = QUEUED
+            job.attempts = 0
+            job.next_attempt = 0.0
+            job.error = None
+            job.progress = None
+        self.changed(job)
+    
+    def remove(self, job_id):
+        """Drop a job that is not running"""
+        with self.lock:
+            job = self.get_job(job_id)
+            if job is None or job_id in self.running:
+                return
+            self.jobs.remove(job)
+        self.changed(job)
+    
+    def add_listener(self, listener):
+        """Call listener(job) on changes, from any thread"""
+        with self.lock:
+            self.listeners.append(listener)
+    
+    def changed(self, job):
+        """Persist the queue and tell listeners"""
+        self.save()
+        with self.lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(job)
+    
+    def start(self):
+        """Start running jobs in the background"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, name='render-queue', daemon=True)
+            self.thread.start()
+    
+    def run(self):
+        """Scheduler loop"""
+        while not self.stopping.is_set():
+            self.process_events(POLL_INTERVAL)
+            self.reap()
+            self.schedule()
+    
+    def process_events(self, timeout=0):
+        """Apply progress and results sent by render processes"""
+        try:
+            event = self.events.get(timeout=timeout) if timeout else self.events.get_nowait()
+        except queue.Empty:
+            return
+        while True:
+            self.handle_event(*event)
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return
+    
+    def handle_event(self, job_id, kind, payload):
+        """Apply one event"""
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        if kind == 'progress':
+            job.progress = payload
+            with self.lock:
+                listeners = list(self.listeners)
+            for listener in listeners:
+                listener(job)  # Not persisted, it changes too often
+            return
+        with self.lock:
+            self.running.pop(job_id, None)
+        if kind == 'done':
+            job.progress = payload
+            self.finish(job, DONE)
+        elif kind == 'cancelled':
+            self.finish(job, CANCELLED)
+        else:
+            message, retryable = payload
+            self.finish(job, FAILED, message, retryable)
+    
+    def reap(self):
+        """Fail jobs whose process exited without reporting"""
+        with self.lock:
+            exited = [job_id for job_id, running in self.running.items() if not running.process.is_alive()]
+        if not exited:
+            return
+        self.process_events()  # A result may have arrived just before the exit
+        for job_id in exited:
+            with self.lock:
+                running = self.running.pop(job_id, None)
+            if running is None:
+                continue
+            running.process.join()
+            job = self.get_job(job_id)
+            if job is not None:
+                self.finish(job, FAILED, f"Render process exited with code {running.process.exitcode}", True)
+    
+    def finish(self, job, status, error=None, retryable=False):
+        """Record the outcome of a run, queueing a retry when attempts are left"""
+        job.attempts += 1
+        job.finished = time.time()
+        job.error = error
+        job.status = status
+        if status == FAILED:
+            print(f"Error rendering {job.output_path}: {error}")
+            if retryable and job.attempts < job.max_attempts:
+                job.status = QUEUED
+                job.next_attempt = time.time() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        self.changed(job)
+    
+    def schedule(self):
+        """Start the next jobs that fit in the budgets"""
+        now = time.time()
+        started = []
+        with self.lock:
+            running = [self.get_job(job_id) for job_id in self.running]
+            cpu_used = sum(self.get_cpu(job) for job in running)
+            memory_used = sum(job.memory for job in running)
+            for job in self.get_jobs():
+                if job.status != QUEUED or job.next_attempt > now:
+                    continue
+                cpu = self.get_cpu(job)
+                fits = cpu_used + cpu <= self.cpu_budget and memory_used + job.memory <= self.memory_budget
+                if not fits and self.running:
+                    break  # Lower priority jobs wait too
+                self.launch(job)
+                started.append(job)
+                cpu_used += cpu
+                memory_used += job.memory
+        for job in started:
+            self.changed(job)
+    
+    def get_cpu(self, job):
+        """Cores a job is charged"""
+        return min(max(1, job.workers), self.cpu_budget)
+    
+    def launch(self, job):
+        """Start a job's render process"""
+        cancel_event = self.context.Event()
+        process = self.context.Process(target=run_job,
+                                       args=(job.to_dict(), self.events, cancel_event, self.get_cpu(job)),
+                                       name=f'render-{job.id}')
+        job.status = RUNNING
+        job.started = time.time()
+        job.progress = None
+        job.error = None
+        process.start()
+        self.running[job.id] = RunningJob(process, cancel_event)
+    
+    def shutdown(self, timeout=STOP_TIMEOUT):
+        """Stop the scheduler and running renders; they are queued again on the next start"""
+        self.stopping.set()
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread:
+            thread.join()
+        with self.lock:
+            running, self.running = self.running, {}
+        for job_running in running.values():
+            job_running.cancel_event.set()
+        for job_id, job_running in running.items():
+            job_running.process.join(timeout)
+            if job_running.process.is_alive():
+                job_running.process.terminate()
+                job_running.process.join()
+            job = self.get_job(job_id)
+            if job:
+                job.status = QUEUED
+                job.progress = None
+        self.save()
+
+_queue = None
+
+def get_render_queue():
+    """Get the application-wide render queue"""
+    global _queue
+    if _queue is None:
+        _queue = RenderQueue()
+    return _queue
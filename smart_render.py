@@ -0,0 +1,299 @@
+"""
+Smart Render
+Exports cut-only edits by stream-copying whole GOPs of the source
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from time import perf_counter
+import numpy as np
+import ffmpeg
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from media_probe import probe_keyframes
+from frame_pipe import FramePipeWriter
+from export_progress import ExportCancelled
+
+AUDIO_RATE = 44100
+FPS_TOLERANCE = 1e-3
+CONTAINERS = ('.mp4', '.mov', '.m4v')
+CANCEL_POLL = 0.1  # Seconds between cancel checks while ffmpeg runs
+
+def get_frame_times(durations, fps):
+    """Clip-local times of the output frames sampled from each clip in a full render"""
+    # Same arithmetic as concatenate_videoclips and iter_frames
+    starts = np.cumsum([0] + list(durations))
+    times = np.arange(0, starts[-1], 1.0 / fps)
+    return [times[(times >= start) & (times < end)] - start for start, end in zip(starts[:-1], starts[1:])]
+
+def run_ffmpeg(stream, progress=None):
+    """Run an ffmpeg command, killing it as soon as the export is cancelled"""
+    process = stream.overwrite_output().run_async(pipe_stdout=True, pipe_stderr=True)
+    while True:
+        try:
+            out, err = process.communicate(timeout=CANCEL_POLL)
+            break
+        except subprocess.TimeoutExpired:
+            try:
+                if progress is not None:
+                    progress.check_cancelled()
+            except ExportCancelled:
+                process.kill()
+                process.communicate()
+                raise
+    if process.returncode:
+        raise ffmpeg.Error('ffmpeg', out, err)
+    return out
+
+def render_frames(clip, local_times, fps, path, options, threads=4, progress=None, logger=None):
+    """Encode the frames of a moviepy clip at the given clip times, video only"""
+    times = local_times
+    clip = clip.fl_time(lambda t: times[min(int(round(t * fps)), len(times) - 1)])
+    clip = clip.set_duration((len(times) - 0.5) / fps)  # iter_frames yields len(times) frames
+    if progress is not None:
+        clip = clip.fl(progress.output_frame)
+        progress.begin(len(times), fps)
+    write_video(clip, path, fps, options, threads, logger=logger)
+
+def write_video(clip, path, fps, options, threads=4, audiofile=None, logger=None):
+    """Encode a moviepy clip, killing the encoder if writing stops"""
+    writer = open_writer(path, clip.size, fps, options, threads, audiofile)
+    if options.get('backend') == 'pipe':
+        frames = clip.iter_frames(fps=fps, logger=logger)  # Converted by the writer, only if needed
+    else:
+        frames = clip.iter_frames(fps=fps, dtype='uint8', logger=logger)
+    try:
+        for frame in frames:
+            writer.write_frame(frame)
+    except BaseException:
+        kill_writer(writer)
+        raise
+    writer.close()
+
+def open_writer(path, size, fps, options, threads=4, audiofile=None):
+    """Start the encoder picked by options['backend']
+    
+    'moviepy' writes the way write_videofile does, 'pipe' streams the
+    frames through FramePipeWriter. Both take frames with write_frame.
+    """
+    if options.get('backend') == 'pipe':
+        return FramePipeWriter(path, size, fps, options, threads, audiofile)
+    return FFMPEG_VideoWriter(path, size, fps, codec=options['vcodec'], preset=options['preset'],
+                              bitrate=options['video_bitrate'], audiofile=audiofile, threads=threads)
+
+def kill_writer(writer):
+    """Stop an encoder after a failure or cancel, without waiting for it to flush"""
+    if isinstance(writer, FramePipeWriter):
+        writer.kill()
+        return
+    writer.proc.kill()
+    try:
+        writer.close()
+    except OSError:
+        pass  # Broken pipe to the killed encoder
+
+def get_decode_delay(path, fps):
+    """Frames between the first packet's decode and display time"""
+    out, _ = (
+        ffmpeg.input(path).video
+        .output('-', vcodec='copy', format='framemd5', **{'frames:v': 1})
+        .run(capture_stdout=True, quiet=True)
+    )
+    time_base = 1.0 / fps
+    for line in out.decode('utf8', errors='ignore').splitlines():
+        if line.startswith('#tb'):
+            num, den = line.split(':')[1].strip().split('/')
+            time_base = int(num) / float(den)
+        elif line and not line.startswith('#'):
+            fields = [field.strip() for field in line.split(',')]
+            return max(0, int(round((int(fields[2]) - int(fields[1])) * time_base * fps)))
+    return 0
+
+def join_parts(parts, fps, audio_path, output_path, workdir, progress=None):
+    """Concatenate (path, frame count) H.264 MP4 parts and the audio without re-encoding"""
+    # Explicit durations place each part at its exact frame offset.
+    # Parts may differ in parameter sets, so they travel in-band, and
+    # decode times are regenerated so B-frame delays line up at joins
+    list_path = os.path.join(workdir, 'parts.txt')
+    with open(list_path, 'w') as f:
+        for part_path, count in parts:
+            f.write(f"file '{os.path.basename(part_path)}'\nduration {count / float(fps)!r}\n")
+    delay = max(get_decode_delay(part_path, fps) for part_path, _ in parts)
+    bsf = f'h264_mp4toannexb,setts=pts=PTS:dts=round((N-{delay})/({fps}*TB))'
+    
+    streams = [ffmpeg.input(list_path, format='concat', safe=0).video]
+    if audio_path:
+        streams.append(ffmpeg.input(audio_path).audio)
+    run_ffmpeg(ffmpeg.output(*streams, output_path, vcodec='copy', acodec='copy',
+                             movflags='+faststart', **{'bsf:v': bsf}), progress)
+
+class SmartRenderUnavailable(Exception):
+    """Raised when an edit has nothing that can be stream-copied"""
+
+class Segment:
+    """A run of output frames that is either copied, re-encoded or rendered"""
+    
+    def __init__(self, kind, clip, count, first_frame=0, processed=None, local_times=None):
+        self.kind = kind  # 'copy', 'encode' or 'render'
+        self.clip = clip
+        self.count = count  # Output frames
+        self.first_frame = first_frame  # Source frame, for copy and encode
+        self.processed = processed  # Effect clip, for render
+        self.local_times = local_times  # Clip times of each output frame, for render
+
+class SmartRenderer:
+    """Copies GOP-aligned middles of untouched clips and re-encodes the rest
+    
+    Frames are assigned to clips exactly as moviepy's concatenate and
+    write_videofile would sample them, so the output has the same frame
+    timing as a full render. Copying assumes closed GOPs, which is what
+    cameras and common encoders produce.
+    """
+    
+    def __init__(self, settings):
+        self.settings = settings
+        self.fps = settings.get('fps', 30)
+        self.progress = None
+    
+    def render(self, clips, output_path, progress):
+        """Export clips, raising SmartRenderUnavailable when a full render is needed"""
+        self.progress = progress
+        if os.path.splitext(output_path)[1].lower() not in CONTAINERS:
+            raise SmartRenderUnavailable("Container does not support stream copy")
+        
+        processed = [clip.get_clip() for clip in clips]
+        if any(p is None for p in processed):
+            raise SmartRenderUnavailable("A clip could not be loaded")
+        segments = self.plan(clips, processed)
+        if not any(segment.kind == 'copy' for segment in segments):
+            raise SmartRenderUnavailable("No clip can be stream-copied")
+        
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        workdir = tempfile.mkdtemp(prefix='smart_render_', dir=output_dir)
+        try:
+            progress.begin(sum(segment.count for segment in segments), self.fps)
+            parts = []
+            for i, segment in enumerate(segments):
+                part_path = os.path.join(workdir, f'{i:05d}.mp4')
+                start = perf_counter()
+                self.write_segment(segment, part_path)
+                progress.add_time('encode', perf_counter() - start)
+                parts.append((part_path, segment.count))
+                progress.advance(segment.count)
+            
+            start = perf_counter()
+            audio_path = self.write_audio(clips, processed, workdir)
+            progress.add_time('audio', perf_counter() - start)
+            join_parts(parts, self.fps, audio_path, output_path, workdir, progress)
+        except ffmpeg.Error as e:
+            message = e.stderr.decode('utf8', errors='ignore').strip() if e.stderr else str(e)
+            raise SmartRenderUnavailable(f"ffmpeg failed: {message}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return segments
+    
+    def plan(self, clips, processed):
+        """Split the output frames into copy, encode and render segments"""
+        size = (max(p.w for p in processed), max(p.h for p in processed))
+        
+        segments = []
+        frame_times = get_frame_times([p.duration for p in processed], self.fps)
+        for clip, clip_processed, local_times in zip(clips, processed, frame_times):
+            if len(local_times):
+                segments.extend(self.plan_clip(clip, clip_processed, local_times, size))
+        return segments
+    
+    def plan_clip(self, clip, processed, local_times, size):
+        """Plan one clip; only whole GOPs of untouched clips are copied"""
+        count = len(local_times)
+        if self.can_copy(clip, size):
+            # Source frames moviepy would read for each output frame
+            source_fps = clip.info.fps
+            frames = (source_fps * (local_times + clip.trim_start) + 0.00001).astype(int)
+            first = int(frames[0])
+            if np.array_equal(frames, np.arange(first, first + count)):
+                keyframes = [int(round(t * source_fps)) for t in probe_keyframes(clip.filepath)]
+                inner = [k for k in keyframes if first <= k <= first + count]
+                if len(inner) >= 2:
+                    copy_start, copy_end = inner[0], inner[-1]
+                    segments = []
+                    if copy_start > first:
+                        segments.append(Segment('encode', clip, copy_start - first, first))
+                    segments.append(Segment('copy', clip, copy_end - copy_start, copy_start))
+                    if first + count > copy_end:
+                        segments.append(Segment('encode', clip, first + count - copy_end, copy_end))
+                    return segments
+        return [Segment('render', clip, count, processed=processed, local_times=local_times)]
+    
+    def can_copy(self, clip, size):
+        """Check whether a clip's frames pass through untouched and match the output"""
+        info = clip.info
+        if not clip.loaded or info is None:
+            return False
+        if clip.speed != 1.0 or len(clip.get_effect_graph()):
+            return False  # Volume is fine, audio is always re-encoded
+        return (self.settings.get('codec') == 'libx264' and info.video_codec == 'h264'
+                and info.pix_fmt == 'yuv420p' and info.resolution == size
+                and abs(info.fps - self.fps) < FPS_TOLERANCE)
+    
+    def get_encode_options(self):
+        """Encoder options shared by every re-encoded segment"""
+        return {
+            'vcodec': 'libx264',
+            'video_bitrate': self.settings.get('bitrate'),
+            'preset': self.settings.get('preset', 'medium'),
+            'pix_fmt': 'yuv420p',
+            'backend': self.settings.get('backend', 'moviepy')
+        }
+    
+    def write_segment(self, segment, path):
+        """Write one segment as an MP4 whose first frame is at time zero"""
+        source_fps = segment.clip.info.fps if segment.clip.info else self.fps
+        if segment.kind == 'copy':
+            # Input seeking with stream copy starts at the keyframe at or
+            # before the seek point; in decode order a run of closed GOPs is
+            # exactly count packets
+            stream = ffmpeg.input(segment.clip.filepath, ss=(segment.first_frame + 0.1) / source_fps)
+            run_ffmpeg(stream.video.output(path, vcodec='copy', **{
+                'frames:v': segment.count, 'bsf:v': 'setts=pts=PTS-STARTPTS:dts=DTS-STARTPTS'
+            }), self.progress)
+        elif segment.kind == 'encode':
+            # Accurate seeking drops decoded frames before the seek point
+            seek = max(0, (segment.first_frame - 0.1) / source_fps)
+            stream = ffmpeg.input(segment.clip.filepath, ss=seek)
+            options = self.get_encode_options()
+            options.pop('backend')  # Picks the writer for rendered frames, ffmpeg has no such option
+            run_ffmpeg(stream.video.output(path, **{'frames:v': segment.count}, **options), self.progress)
+        else:
+            self.write_rendered(segment, path)
+    
+    def write_rendered(self, segment, path):
+        """Render a clip with effects through moviepy at the exact frame times"""
+        render_frames(segment.processed, segment.local_times, self.fps, path, self.get_encode_options(),
+                      logger=self.progress.get_logger())
+    
+    def write_audio(self, clips, processed, workdir):
+        """Mix the clips' audio the way the full render would; None if all are silent"""
+        if not any(clip.info and clip.info.has_audio for clip in clips):
+            return None
+        
+        streams = []
+        for clip, clip_processed in zip(clips, processed):
+            duration = clip_processed.duration
+            if clip.info and clip.info.has_audio:
+                audio = (
+                    ffmpeg.input(clip.filepath).audio
+                    .filter('atrim', start=clip.trim_start, duration=duration)
+                    .filter('asetpts', 'PTS-STARTPTS')
+                )
+                if clip.volume != 1.0:
+                    audio = audio.filter('volume', clip.volume)
+            else:
+                audio = ffmpeg.input(f'anullsrc=r={AUDIO_RATE}:cl=stereo', format='lavfi', t=duration).audio
+            streams.append(audio.filter('aformat', sample_rates=AUDIO_RATE, channel_layouts='stereo'))
+        
+        audio_path = os.path.join(workdir, 'audio.m4a')
+        run_ffmpeg(ffmpeg.concat(*streams, v=0, a=1).output(audio_path, acodec='aac', audio_bitrate='192k'),
+                   self.progress)
+        return audio_path
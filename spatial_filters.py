@@ -0,0 +1,74 @@
+"""
+Spatial Filters
+Separable per-channel blur and sharpen filters on uint8 frames
+"""
+
+import math
+import numpy as np
+import cv2
+
+TRUNCATE = 4.0  # Gaussian support in sigmas, as scipy's gaussian_filter uses
+BORDER = cv2.BORDER_REFLECT  # Mirror the edge pixel, like scipy's default 'reflect'
+MAX_DIRECT_SIGMA = 8.0  # Larger blurs run on a downscaled frame
+
+def gaussian_radius(sigma):
+    """Pixels of neighbours a Gaussian of this sigma reads on each side"""
+    return int(TRUNCATE * sigma + 0.5)
+
+def get_downscale(sigma):
+    """Power of two a blur of this sigma is computed at, 1 for a direct blur"""
+    if sigma <= MAX_DIRECT_SIGMA:
+        return 1
+    return 2 ** math.ceil(math.log2(sigma / MAX_DIRECT_SIGMA))
+
+def blur_halo(sigma):
+    """Rows a strip of a blurred frame needs around it, None if it needs the whole frame"""
+    if get_downscale(sigma) > 1:
+        return None  # Resampling blocks depend on where the frame starts
+    return gaussian_radius(sigma)
+
+def gaussian_blur(frame, sigma, dst=None, arena=None):
+    """Blur each channel with a separable Gaussian
+    
+    Sigmas above MAX_DIRECT_SIGMA blur a frame downscaled by a power of two
+    and scale the result back up, which keeps the cost flat as sigma grows.
+    The downscaled frame is kept in the arena when one is given.
+    """
+    if sigma <= 0:
+        return frame
+    factor = get_downscale(sigma)
+    if factor == 1:
+        size = 2 * gaussian_radius(sigma) + 1
+        return cv2.GaussianBlur(frame, (size, size), sigma, dst=dst, sigmaY=sigma, borderType=BORDER)
+    
+    height, width = frame.shape[:2]
+    small_size = (max(1, -(-width // factor)), max(1, -(-height // factor)))
+    small = None
+    if arena is not None:
+        small = arena.scratch('downscaled', small_size[::-1] + frame.shape[2:], frame.dtype.type)
+    small = cv2.resize(frame, small_size, dst=small, interpolation=cv2.INTER_AREA)
+    small_sigma = sigma / factor
+    size = 2 * gaussian_radius(small_sigma) + 1
+    cv2.GaussianBlur(small, (size, size), small_sigma, dst=small, sigmaY=small_sigma, borderType=BORDER)
+    return cv2.resize(small, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR)
+
+def box_blur(frame, radius, dst=None):
+    """Average each channel over a (2 * radius + 1) square"""
+    if radius <= 0:
+        return frame
+    size = 2 * int(radius) + 1
+    return cv2.blur(frame, (size, size), dst=dst, borderType=BORDER)
+
+def unsharp_mask(frame, sigma=1.0, amount=1.0, dst=None, arena=None):
+    """Sharpen by adding amount times the difference from a Gaussian blur
+    
+    The result saturates at 0 and 255 instead of wrapping around. dst may
+    be frame itself; the blurred copy is kept in the arena when one is given.
+    """
+    if amount == 0:
+        return frame
+    blurred = None
+    if arena is not None:
+        blurred = arena.scratch('unsharp', frame.shape, frame.dtype.type)
+    blurred = gaussian_blur(frame, sigma, blurred, arena)
+    return cv2.addWeighted(frame, 1.0 + amount, blurred, -amount, 0, dst=dst)
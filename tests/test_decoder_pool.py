@@ -0,0 +1,64 @@
+"""
+Decoder pool tests
+Checks that shared readers stay open while views or renders use them
+"""
+
+import gc
+import subprocess
+import pytest
+from moviepy.config import get_setting
+from decoder_pool import DecoderPool
+
+@pytest.fixture(scope='module')
+def sources(tmp_path_factory):
+    """Three short test videos"""
+    folder = tmp_path_factory.mktemp('media')
+    paths = []
+    for name in 'abc':
+        path = str(folder / f'{name}.mp4')
+        subprocess.run([get_setting("FFMPEG_BINARY"), '-loglevel', 'error', '-y', '-f', 'lavfi',
+                        '-i', 'testsrc=size=64x48:rate=10', '-t', '2', '-pix_fmt', 'yuv420p', path],
+                       check=True)
+        paths.append(path)
+    return paths
+
+def test_eviction_skips_readers_with_live_views(sources):
+    a, b, c = sources
+    pool = DecoderPool(max_open=1)
+    for path in sources:
+        pool.acquire(path)
+    view_a = pool.view(a, 0, 1)
+    view_b = pool.view(b, 0, 1)
+    assert view_a.get_frame(0.5).shape == (48, 64, 3)
+    
+    # Once the view is gone its reader is evicted as usual
+    del view_a, view_b
+    gc.collect()
+    pool.get_reader(c)
+    assert pool.stats()['open'] == 1
+    pool.close_all()
+
+def test_release_waits_for_pins(sources):
+    a = sources[0]
+    pool = DecoderPool()
+    pool.acquire(a)
+    reader = pool.pin(a)
+    pool.release(a)
+    assert reader.get_frame(0.5).shape == (48, 64, 3)
+    assert pool.stats()['sources'] == 1
+    
+    pool.unpin(a)
+    assert pool.stats()['sources'] == 0
+    assert reader.reader is None
+
+def test_release_waits_for_views(sources):
+    a = sources[0]
+    pool = DecoderPool()
+    pool.acquire(a)
+    view = pool.view(a, 0, 1)
+    pool.release(a)
+    assert view.get_frame(0.5).shape == (48, 64, 3)
+    
+    del view
+    gc.collect()
+    assert pool.stats()['sources'] == 0
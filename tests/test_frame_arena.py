@@ -0,0 +1,144 @@
+"""
+Frame arena tests
+Checks that effect kernels and pipelined export reuse their frame buffers
+"""
+
+import threading
+import time
+import tracemalloc
+import numpy as np
+import pytest
+from frame_arena import FrameArena
+from effect_graph import EffectGraph, FusedKernel
+from tiled_executor import TiledExecutor
+from export_pipeline import ExportPipeline
+from export_progress import ProgressTracker
+
+WIDTH, HEIGHT = 1280, 720  # Smallest frame the tiled executor splits
+FRAMES = 8
+
+def random_frame(width, height, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+def traced_peak(func, frames=FRAMES, warmup=5):
+    """Peak bytes traced above the starting point while func(i) runs, after a warm-up"""
+    for i in range(warmup):
+        func(i)
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(warmup, warmup + frames):
+            func(i)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+class StillClip:
+    """Timeline clip stand-in whose source returns one frame, so decoding allocates nothing"""
+    
+    def __init__(self, frame, duration, graph):
+        self.frame = frame
+        self.h, self.w = frame.shape[:2]
+        self.duration = duration
+        self.graph = graph
+    
+    def get_source_clip(self):
+        return self
+    
+    def get_effect_graph(self):
+        return self.graph
+    
+    def get_frame(self, t):
+        return self.frame
+
+class WindowWriter:
+    """Writer that traces allocations between two output frames
+    
+    It stalls on the first frame until the pipeline has every frame it can
+    hold in flight, so the output pool is full before tracing starts.
+    """
+    
+    def __init__(self, start, end, stall=0.5):
+        self.start = start
+        self.end = end
+        self.stall = stall
+        self.frames = 0
+        self.base = 0
+        self.peak = None
+    
+    def write_frame(self, frame):
+        if self.frames == 0:
+            time.sleep(self.stall)
+        self.frames += 1
+        if self.frames == self.start:
+            tracemalloc.start()
+            self.base = tracemalloc.get_traced_memory()[0]
+        elif self.frames == self.end:
+            self.peak = tracemalloc.get_traced_memory()[1] - self.base
+            tracemalloc.stop()
+
+def test_acquire_reuses_released_buffers():
+    arena = FrameArena()
+    for dtype in (np.uint8, np.dtype('uint8'), 'uint8'):
+        buffer = arena.acquire([HEIGHT, WIDTH, 3], dtype)
+        arena.release(buffer)
+    assert arena.count() == 1
+
+def test_release_ignores_foreign_buffers():
+    arena = FrameArena()
+    arena.release(np.empty((4, 4, 3), dtype=np.uint8))
+    assert arena.count() == 0
+    arena.acquire((4, 4, 3))
+    assert arena.count() == 1
+
+def test_scratch_grows_and_is_per_thread():
+    arena = FrameArena()
+    large = arena.scratch('work', (8, 8, 3))
+    small = arena.scratch('work', (4, 8, 3))
+    assert small.shape == (4, 8, 3)
+    assert np.shares_memory(large, small)
+    
+    other = []
+    thread = threading.Thread(target=lambda: other.append(arena.scratch('work', (4, 8, 3))))
+    thread.start()
+    thread.join()
+    assert not np.shares_memory(other[0], small)
+
+CHAINS = {
+    'color': lambda: EffectGraph().color_correction(10, 1.2, 1.3),
+    'sepia, fade in': lambda: EffectGraph().sepia().fadein(10),
+    'blur': lambda: EffectGraph().blur(3),
+    'downscaled blur': lambda: EffectGraph().blur(20),
+    'box blur, sharpen': lambda: EffectGraph().box_blur(2).sharpen(1.5),
+    'everything': lambda: EffectGraph().color_correction(5, 1.1, 0.8).blur(2).sharpen(1.0).invert()
+}
+
+@pytest.fixture(scope='module')
+def executor():
+    executor = TiledExecutor(4)
+    yield executor
+    executor.shutdown()
+
+@pytest.mark.parametrize('name', list(CHAINS))
+def test_kernel_steady_state_allocates_no_frames(name, executor):
+    graph = CHAINS[name]()
+    frame = random_frame(WIDTH, HEIGHT)
+    out = np.empty_like(frame)
+    limit = frame.nbytes // 16  # Anything frame sized shows up well above this
+    single = FusedKernel(graph.nodes, 60)
+    tiled = FusedKernel(graph.nodes, 60, executor)
+    
+    # Without an out buffer every frame is new, which tracemalloc must see
+    assert traced_peak(lambda i: single(frame, i / 30.0)) >= frame.nbytes
+    assert traced_peak(lambda i: single(frame, i / 30.0, out)) < limit
+    assert traced_peak(lambda i: tiled(frame, i / 30.0, out)) < limit
+
+def test_pipelined_export_steady_state_allocates_no_frames():
+    frame = random_frame(640, 360)
+    clips = [StillClip(frame, 4, EffectGraph().color_correction(10, 1.2, 1.3).sharpen(1.0)),
+             StillClip(random_frame(480, 270), 4, EffectGraph().sepia())]  # Placed on the canvas
+    writer = WindowWriter(40, 200)
+    ExportPipeline(30).render(clips, writer, ProgressTracker())
+    assert writer.frames == 240
+    assert writer.peak is not None
+    assert writer.peak < frame.nbytes // 16
@@ -0,0 +1,108 @@
+"""
+Spatial filter tests
+Checks the cv2 blur and sharpen filters against float references
+"""
+
+import cv2
+import numpy as np
+import pytest
+from spatial_filters import gaussian_blur, box_blur, unsharp_mask, gaussian_radius
+from effect_graph import EffectGraph, FusedKernel
+from tiled_executor import TiledExecutor
+
+def filter_reference(frame, kernel):
+    """Float64 separable filter of each channel with mirrored edges"""
+    radius = len(kernel) // 2
+    result = frame.astype(np.float64)
+    for axis in (0, 1):
+        pad = [(0, 0)] * 3
+        pad[axis] = (radius, radius)
+        padded = np.pad(result, pad, mode='symmetric')
+        length = frame.shape[axis]
+        result = sum(weight * np.take(padded, np.arange(i, i + length), axis=axis)
+                     for i, weight in enumerate(kernel))
+    return result
+
+def gaussian_weights(sigma):
+    """Normalised Gaussian taps over the filter radius"""
+    radius = gaussian_radius(sigma)
+    taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    return taps / taps.sum()
+
+def max_difference(frame, expected):
+    return np.abs(frame.astype(np.float64) - expected).max()
+
+@pytest.fixture(scope='module')
+def sample():
+    """Smooth content with hard edges, so rounding and saturation both show"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    frame = cv2.resize(frame, (320, 180), interpolation=cv2.INTER_CUBIC)
+    frame[:, 150:170] = 255
+    frame[75:100, :] = 0
+    return frame
+
+@pytest.mark.parametrize('sigma', [0.8, 2.0, 5.0, 8.0])
+def test_gaussian_matches_float(sample, sigma):
+    expected = np.round(filter_reference(sample, gaussian_weights(sigma)))
+    # cv2 blurs uint8 in fixed point, which can round a level further
+    assert max_difference(gaussian_blur(sample, sigma), expected) <= 2
+
+@pytest.mark.parametrize('radius', [1, 3])
+def test_box_matches_float(sample, radius):
+    size = 2 * radius + 1
+    expected = np.round(filter_reference(sample, np.full(size, 1.0 / size)))
+    assert max_difference(box_blur(sample, radius), expected) <= 1
+
+@pytest.mark.parametrize('amount', [0.5, 1.0, 2.0])
+def test_unsharp_saturates_like_float(sample, amount):
+    blurred = filter_reference(sample, gaussian_weights(1.0))
+    expected = np.clip(np.round((1 + amount) * sample - amount * blurred), 0, 255)
+    # The blur's rounding is scaled by amount
+    assert max_difference(unsharp_mask(sample, 1.0, amount), expected) <= 1 + np.ceil(amount)
+
+def test_channels_filtered_independently(sample):
+    single = np.zeros_like(sample)
+    single[..., 1] = sample[..., 1]
+    blurred = gaussian_blur(single, 3.0)
+    assert not blurred[..., 0].any()
+    assert not blurred[..., 2].any()
+
+def test_sharpen_leaves_flat_frames_alone(sample):
+    flat = np.full_like(sample, 250)
+    assert np.array_equal(unsharp_mask(flat, 1.0, 2.0), flat)
+
+def test_downscaled_blur_close_to_direct(sample):
+    expected = filter_reference(sample, gaussian_weights(24.0))
+    assert np.abs(gaussian_blur(sample, 24.0) - expected).mean() < 1.0
+
+def test_filters_write_into_dst(sample):
+    out = np.empty_like(sample)
+    assert gaussian_blur(sample, 2.0, out) is out
+    assert box_blur(sample, 2, out) is out
+    assert unsharp_mask(sample, 1.0, 1.0, out) is out
+
+@pytest.mark.parametrize('sigma', [1.0, 3.0])
+def test_gaussian_matches_scipy(sample, sigma):
+    ndimage = pytest.importorskip('scipy.ndimage')
+    expected = ndimage.gaussian_filter(sample.astype(np.float64), sigma=(sigma, sigma, 0),
+                                       mode='reflect', truncate=4.0)
+    assert max_difference(gaussian_blur(sample, sigma), np.round(expected)) <= 2
+
+def test_unsharp_matches_scipy(sample):
+    ndimage = pytest.importorskip('scipy.ndimage')
+    frame = sample.astype(np.float64)
+    blurred = ndimage.gaussian_filter(frame, sigma=(1.0, 1.0, 0), mode='reflect', truncate=4.0)
+    expected = np.clip(np.round(2 * frame - blurred), 0, 255)
+    assert max_difference(unsharp_mask(sample, 1.0, 1.0), expected) <= 2
+
+@pytest.mark.parametrize('graph', [EffectGraph().blur(3.0), EffectGraph().box_blur(2).sharpen(1.5)],
+                         ids=['blur', 'box blur, sharpen'])
+def test_filters_identical_in_strips(graph):
+    frame = np.random.default_rng(1).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    executor = TiledExecutor(4)
+    try:
+        tiled = FusedKernel(graph.nodes, None, executor)(frame)
+    finally:
+        executor.shutdown()
+    assert np.array_equal(tiled, FusedKernel(graph.nodes)(frame))
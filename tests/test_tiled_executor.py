@@ -0,0 +1,30 @@
+"""
+Tiled executor tests
+Checks how strip pools are sized in each process
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import tiled_executor
+from tiled_executor import get_tiled_executor, set_tiled_workers
+from parallel_export import init_worker
+
+def get_strip_workers():
+    return get_tiled_executor().workers
+
+def test_set_tiled_workers_replaces_process_executor():
+    previous = tiled_executor._executor
+    try:
+        set_tiled_workers(3)
+        assert get_tiled_executor().workers == 3
+        set_tiled_workers(0)
+        assert get_tiled_executor().workers == 1
+    finally:
+        get_tiled_executor().shutdown()
+        tiled_executor._executor = previous
+
+def test_parallel_export_workers_share_the_cores():
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=init_worker,
+                             initargs=(context.Event(), 2)) as executor:
+        assert executor.submit(get_strip_workers).result() == 2
@@ -0,0 +1,193 @@
+"""
+Thumbnail Cache
+Generates timeline filmstrip thumbnails from keyframes in the background
+"""
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+import math
+import os
+import queue
+import re
+import threading
+import numpy as np
+import ffmpeg
+from app_paths import get_cache_dir, file_cache_key
+
+THUMBNAIL_VERSION = 1
+THUMB_HEIGHT = 64
+MIN_BUCKET = 0   # 1 pixel per second
+MAX_BUCKET = 10  # 1024 pixels per second
+
+def get_bucket(pixels_per_second):
+    """Mipmap level for a zoom; rounding up keeps neighbouring thumbnails overlapping"""
+    bucket = math.ceil(math.log2(max(pixels_per_second, 1e-6)))
+    return max(MIN_BUCKET, min(MAX_BUCKET, bucket))
+
+class Filmstrip:
+    """Keyframe thumbnails of a file with one index level per zoom bucket"""
+    
+    def __init__(self, times, images, levels=None):
+        self.times = times  # Keyframe times in seconds, ascending
+        self.images = images  # (count, height, width, 3) uint8
+        self.levels = levels if levels is not None else self.build_levels()
+        self.pixmaps = {}
+    
+    @property
+    def thumb_width(self):
+        """Width of a thumbnail in pixels"""
+        return self.images.shape[2]
+    
+    def get_slot(self, bucket):
+        """Seconds between thumbnails at a zoom bucket"""
+        return self.thumb_width / float(2 ** bucket)
+    
+    def build_levels(self):
+        """Pick the nearest preceding keyframe for each slot of every bucket"""
+        levels = {}
+        duration = float(self.times[-1]) if len(self.times) else 0
+        for bucket in range(MIN_BUCKET, MAX_BUCKET + 1):
+            slot = self.get_slot(bucket)
+            slot_times = np.arange(int(duration / slot) + 1) * slot
+            indices = np.searchsorted(self.times, slot_times + 1e-6, side='right') - 1
+            levels[bucket] = np.clip(indices, 0, len(self.times) - 1).astype(np.int32)
+        return levels
+    
+    def get_thumbnails(self, pixels_per_second, start, end):
+        """Get (time, index) of the slots covering source times start..end"""
+        bucket = get_bucket(pixels_per_second)
+        level = self.levels[bucket]
+        slot = self.get_slot(bucket)
+        first = max(0, int(start / slot))
+        last = int(math.ceil(end / slot))
+        # Slots after the last keyframe keep showing it
+        return [(k * slot, int(level[min(k, len(level) - 1)])) for k in range(first, last + 1)]
+    
+    def get_pixmap(self, index):
+        """Get a thumbnail as a pixmap, converting it on first use"""
+        pixmap = self.pixmaps.get(index)
+        if pixmap is None:
+            image = np.ascontiguousarray(self.images[index])
+            h, w, ch = image.shape
+            qimage = QImage(image.data, w, h, ch * w, QImage.Format.Format_RGB888)
+            pixmap = QPixmap.fromImage(qimage)  # Copies the pixels
+            self.pixmaps[index] = pixmap
+        return pixmap
+    
+    def save(self, path):
+        """Write the filmstrip to an npz file"""
+        temp_path = path + '.tmp.npz'
+        levels = {f'level_{bucket}': indices for bucket, indices in self.levels.items()}
+        np.savez(temp_path, version=THUMBNAIL_VERSION, times=self.times,
+                 images=self.images, **levels)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """Read a filmstrip from an npz file, or None if missing or stale"""
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != THUMBNAIL_VERSION:
+                    return None
+                levels = {bucket: data[f'level_{bucket}']
+                          for bucket in range(MIN_BUCKET, MAX_BUCKET + 1)}
+                return cls(data['times'], data['images'], levels)
+        except (OSError, ValueError, KeyError):
+            return None
+
+def extract_keyframes(filepath, height=THUMB_HEIGHT):
+    """Decode only the keyframes of a file as small RGB thumbnails"""
+    from media_probe import probe
+    info = probe(filepath)
+    width = max(2, int(round(info.width * height / float(info.height or 1) / 2)) * 2)
+    
+    # showinfo logs the timestamp of every frame that reaches the pipe
+    out, err = (
+        ffmpeg
+        .input(filepath, skip_frame='nokey')
+        .video
+        .filter('scale', width, height)
+        .filter('showinfo')
+        .output('pipe:', format='rawvideo', pix_fmt='rgb24', vsync=0)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    times = [float(t) for t in re.findall(rb'pts_time:\s*([-\d.]+)', err)]
+    images = np.frombuffer(out, np.uint8).reshape(-1, height, width, 3)
+    count = min(len(times), len(images))
+    if count == 0:
+        raise IOError(f"No keyframes decoded from {filepath}")
+    return np.array(times[:count]), images[:count]
+
+class ThumbnailWorker(QThread):
+    """Loads or generates filmstrips one file at a time"""
+    
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.requests = queue.Queue()
+    
+    def run(self):
+        """Process requests until a None is queued"""
+        while True:
+            filepath = self.requests.get()
+            if filepath is None:
+                return
+            self.cache.build(filepath)
+
+class ThumbnailCache(QObject):
+    """Filmstrips for the timeline; nothing is decoded on the paint path"""
+    
+    thumbnails_ready = pyqtSignal(str)
+    
+    def __init__(self):
+        super().__init__()
+        self.strips = {}  # filepath -> Filmstrip, or None while pending or failed
+        self.lock = threading.Lock()
+        self.worker = None
+    
+    def get(self, filepath):
+        """Get the filmstrip of a file, queueing it if it isn't loaded yet"""
+        with self.lock:
+            if filepath in self.strips:
+                return self.strips[filepath]
+            self.strips[filepath] = None
+        
+        if self.worker is None:
+            self.worker = ThumbnailWorker(self)
+            self.worker.start()
+        self.worker.requests.put(filepath)
+        return None
+    
+    def get_cache_path(self, filepath):
+        """Location of the persisted filmstrip for a file"""
+        return os.path.join(get_cache_dir('thumbnails'), file_cache_key(filepath) + '.npz')
+    
+    def build(self, filepath):
+        """Load a filmstrip from disk or decode it; runs on the worker thread"""
+        try:
+            cache_path = self.get_cache_path(filepath)
+            strip = Filmstrip.load(cache_path)
+            if strip is None:
+                strip = Filmstrip(*extract_keyframes(filepath))
+                strip.save(cache_path)
+        except Exception as e:
+            print(f"Error generating thumbnails: {e}")
+            return
+        
+        with self.lock:
+            self.strips[filepath] = strip
+        self.thumbnails_ready.emit(filepath)
+    
+    def stop(self):
+        """Stop the worker thread, dropping requests it hasn't started"""
+        if self.worker:
+            with self.lock:
+                self.strips = {path: strip for path, strip in self.strips.items() if strip}
+            try:
+                while True:
+                    self.worker.requests.get_nowait()
+            except queue.Empty:
+                pass
+            self.worker.requests.put(None)
+            self.worker.wait()
+            self.worker = None
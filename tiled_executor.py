@@ -0,0 +1,101 @@
+"""
+Tiled Executor
+Runs per-pixel kernels on horizontal strips of a frame in parallel
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import numpy as np
+from frame_arena import FrameArena
+
+MIN_TILED_PIXELS = 1280 * 720  # Smaller frames run on the calling thread
+MIN_STRIP_ROWS = 64  # Shorter strips cost more in dispatch than they save
+STRIPS_PER_WORKER = 2  # Extra strips even out workers that start late
+
+class TiledExecutor:
+    """Splits frames into strips and runs a kernel on each in a persistent thread pool
+    
+    Strips are written into one shared output buffer. Kernels that read
+    neighbouring pixels get halo rows above and below their strip and only
+    the strip itself is kept, so the result is bit-identical to running the
+    kernel on the whole frame.
+    """
+    
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.executor = None  # Started on the first tiled frame
+        self.lock = threading.Lock()
+        self.arena = FrameArena()  # Halo strips render into per-worker scratch
+    
+    def get_strips(self, height, width):
+        """Row ranges to split a frame into; one range when tiling would not pay off"""
+        count = 1
+        if self.workers > 1 and height * width >= MIN_TILED_PIXELS:
+            count = max(1, min(self.workers * STRIPS_PER_WORKER, height // MIN_STRIP_ROWS))
+        bounds = np.linspace(0, height, count + 1).astype(int).tolist()
+        return list(zip(bounds[:-1], bounds[1:]))
+    
+    def run(self, kernel, frame, halo=0, out=None):
+        """Run kernel(src, out) over strips of frame; returns the output frame
+        
+        kernel writes the result for src into out when it can and returns
+        the result either way. It must keep the frame's shape and produce
+        uint8. halo is how many rows of neighbours it reads on each side.
+        """
+        height, width = frame.shape[:2]
+        strips = self.get_strips(height, width)
+        if len(strips) == 1:
+            return kernel(frame, out)
+        
+        if out is None:
+            out = np.empty(frame.shape, dtype=np.uint8)
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tiles')
+            executor = self.executor
+        rows = min(height, max(end - start for start, end in strips) + 2 * halo)
+        futures = [executor.submit(self.run_strip, kernel, frame, out, start, end, halo, rows)
+                   for start, end in strips]
+        for future in futures:
+            future.result()
+        return out
+    
+    def run_strip(self, kernel, frame, out, start, end, halo, rows):
+        """Run the kernel on one strip and the rows around it, keeping the strip"""
+        if not halo:
+            target = out[start:end]
+            result = kernel(frame[start:end], target)
+            if result is not target:
+                target[...] = result  # The kernel could not write in place
+            return
+        # Strips at the edges read extra rows on their inner side, so every
+        # strip's source has the same shape and per-worker scratch stops growing
+        top = min(max(0, start - halo), frame.shape[0] - rows)
+        bottom = top + rows
+        scratch = self.arena.scratch('strip', (bottom - top,) + frame.shape[1:])
+        result = kernel(frame[top:bottom], scratch)
+        out[start:end] = result[start - top:end - top]
+    
+    def shutdown(self):
+        """Stop the worker threads"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+_executor = None
+
+def get_tiled_executor():
+    """Get the process-wide tiled executor, one worker per core unless set otherwise"""
+    global _executor
+    if _executor is None:
+        _executor = TiledExecutor()
+    return _executor
+
+def set_tiled_workers(workers):
+    """Size the process-wide tiled executor to this process's share of the cores"""
+    global _executor
+    executor, _executor = _executor, TiledExecutor(workers)
+    if executor:
+        executor.shutdown()
@@ -5,9 +5,29 @@ Displays and manages the video editing timeline
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QScrollArea,
                              QLabel, QPushButton, QSlider)
-from PyQt6.QtCore import Qt, pyqtSignal, QRect
-from PyQt6.QtGui import QPainter, QColor, QPen, QBrush
+from PyQt6.QtCore import Qt, pyqtSignal, QRect, QLineF, QPoint
+from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QPixmap
 import math
+from time import perf_counter
+import numpy as np
+from thumbnail_cache import ThumbnailCache, THUMB_HEIGHT
+from audio_peaks import AudioPeaksCache
+from interval_index import IntervalIndex
+
+# Ruler tick ladder, finest first
+FRAME_STEPS = [1, 2, 5, 10]
+SECOND_STEPS = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400]
+MIN_TICK_SPACING = 8  # Pixels between minor ticks
+MIN_LABEL_SPACING = 80  # Pixels between labelled ticks
+
+def format_timecode(seconds, fps, show_frames=False):
+    """Format seconds as H:MM:SS, MM:SS, or with a :FF frame field"""
+    rate = max(1, int(round(fps)))
+    whole, frames = divmod(int(round(seconds * rate)), rate)
+    hours, rest = divmod(whole, 3600)
+    minutes, secs = divmod(rest, 60)
+    text = f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+    return f"{text}:{frames:02d}" if show_frames else text
 
 class TimelineWidget(QWidget):
     """Timeline widget for displaying and editing video clips"""
@@ -18,11 +38,23 @@ class TimelineWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.clips = []
+        self.clip_index = IntervalIndex()
         self.selected_clip = None
         self.playhead_position = 0
         self.zoom_level = 1.0
         self.pixels_per_second = 50  # Base zoom level
         self.scroll_position = 0
+        self.thumbnails = ThumbnailCache()
+        self.thumbnails.thumbnails_ready.connect(self.on_media_analyzed)
+        self.audio_peaks = AudioPeaksCache()
+        self.audio_peaks.peaks_ready.connect(self.on_media_analyzed)
+        
+        # Cached paint state; see invalidate_layers
+        self.theme = None
+        self.background_layer = None  # Background and time markers
+        self.clip_layer = None  # Clips on a transparent pixmap
+        self.paint_counters = {'paints': 0, 'partial_paints': 0, 'background_renders': 0,
+                               'clip_renders': 0, 'total_ms': 0.0, 'last_ms': 0.0}
         
         self.init_ui()
         
@@ -53,37 +85,53 @@ class TimelineWidget(QWidget):
         """Add a clip to the timeline"""
         self.clips.append(clip)
         clip.end_time = clip.start_time + clip.duration
-        self.update()
+        self.clip_index.add(clip)
+        clip.add_timing_listener(self.on_clip_timing_changed)
+        self.invalidate_layers()
     
     def remove_clip(self, clip):
         """Remove a clip from timeline"""
         if clip in self.clips:
             self.clips.remove(clip)
+            self.clip_index.remove(clip)
+            clip.remove_timing_listener(self.on_clip_timing_changed)
             if self.selected_clip == clip:
                 self.selected_clip = None
-            self.update()
+            self.invalidate_layers()
     
     def update_clip(self, clip):
         """Update clip display"""
-        self.update()
+        self.clip_index.invalidate()
+        self.invalidate_layers()
+    
+    def on_clip_timing_changed(self, clip):
+        """Re-sort the clip index after a split, trim or move"""
+        self.clip_index.invalidate()
+        self.invalidate_layers()
     
     def clear(self):
         """Clear all clips"""
+        for clip in self.clips:
+            clip.remove_timing_listener(self.on_clip_timing_changed)
         self.clips = []
+        self.clip_index.clear()
         self.selected_clip = None
         self.playhead_position = 0
-        self.update()
+        self.invalidate_layers()
     
     def set_position(self, position):
         """Set playhead position"""
+        # Only the strips under the old and new playhead are repainted
+        old_rect = self.get_playhead_rect()
         self.playhead_position = position
-        self.update()
+        new_rect = self.get_playhead_rect()
+        if old_rect != new_rect:
+            self.update(old_rect)
+            self.update(new_rect)
     
     def get_total_duration(self):
         """Get total duration of all clips"""
-        if not self.clips:
-            return 0
-        return max(clip.end_time for clip in self.clips)
+        return self.clip_index.get_end()
     
     def get_timeline_data(self):
         """Get timeline data for saving"""
@@ -97,73 +145,169 @@ class TimelineWidget(QWidget):
         """Zoom in on timeline"""
         self.zoom_level = min(self.zoom_level * 1.5, 10.0)
         self.pixels_per_second = 50 * self.zoom_level
-        self.update()
+        self.invalidate_layers()
     
     def zoom_out(self):
         """Zoom out on timeline"""
         self.zoom_level = max(self.zoom_level / 1.5, 0.1)
         self.pixels_per_second = 50 * self.zoom_level
+        self.invalidate_layers()
+    
+    def invalidate_layers(self, background=True):
+        """Drop cached layers after an edit, zoom, scroll or resize"""
+        if background:
+            self.background_layer = None
+        self.clip_layer = None
         self.update()
     
-    def paintEvent(self, event):
-        """Paint the timeline"""
-        painter = QPainter(self)
+    def refresh_theme(self):
+        """Rebuild colors, pens and brushes after a theme change"""
+        self.theme = None
+        self.invalidate_layers()
+    
+    def get_theme(self):
+        """Get the colors, pens and brushes used for painting"""
+        if self.theme is None:
+            from PyQt6.QtWidgets import QApplication
+            app = QApplication.instance()
+            theme_colors = (app.property('theme_colors') if app else None) or {}
+            
+            fg_color = QColor(theme_colors.get('timeline_fg', QColor(200, 200, 200)))
+            text_color = QColor(theme_colors.get('timeline_fg', QColor(255, 255, 255)))
+            major_color = QColor(fg_color)
+            major_color.setAlpha(150)
+            minor_color = QColor(fg_color)
+            minor_color.setAlpha(100)
+            wave_color = QColor(text_color)
+            wave_color.setAlpha(180)
+            self.theme = {
+                'background': QColor(theme_colors.get('timeline_bg', QColor(40, 40, 40))),
+                'label_pen': QPen(fg_color, 1),
+                'major_pen': QPen(major_color, 1),
+                'minor_pen': QPen(minor_color, 1),
+                'clip_brush': QBrush(theme_colors.get('timeline_clip', QColor(60, 120, 200))),
+                'selected_brush': QBrush(theme_colors.get('timeline_selected', QColor(100, 150, 255))),
+                'border_pen': QPen(text_color, 2),
+                'text_pen': QPen(text_color),
+                'wave_pen': QPen(wave_color, 1),
+                'playhead_pen': QPen(QColor(255, 0, 0), 2),
+                'playhead_brush': QBrush(QColor(255, 0, 0))
+            }
+        return self.theme
+    
+    def create_layer(self):
+        """Create a transparent pixmap covering the widget"""
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(max(1, int(self.width() * ratio)), max(1, int(self.height() * ratio)))
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(Qt.GlobalColor.transparent)
+        return layer
+    
+    def render_background_layer(self):
+        """Render the background and time markers"""
+        self.background_layer = self.create_layer()
+        painter = QPainter(self.background_layer)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Get theme colors
-        from PyQt6.QtWidgets import QApplication
-        app = QApplication.instance()
-        theme_colors = None
-        if app:
-            theme_colors = app.property('theme_colors')
-        
-        if theme_colors:
-            bg_color = theme_colors.get('timeline_bg', QColor(40, 40, 40))
-            fg_color = theme_colors.get('timeline_fg', QColor(200, 200, 200))
-        else:
-            bg_color = QColor(40, 40, 40)
-            fg_color = QColor(200, 200, 200)
-        
-        # Draw background
-        painter.fillRect(self.rect(), bg_color)
-        
-        # Draw time markers
-        self.draw_time_markers(painter, fg_color)
-        
-        # Draw clips
-        for clip in self.clips:
+        theme = self.get_theme()
+        painter.fillRect(self.rect(), theme['background'])
+        self.draw_time_markers(painter, theme)
+        painter.end()
+        self.paint_counters['background_renders'] += 1
+    
+    def render_clip_layer(self):
+        """Render the clips in the visible time range"""
+        self.clip_layer = self.create_layer()
+        painter = QPainter(self.clip_layer)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for clip in self.clip_index.query(*self.get_visible_range()):
             self.draw_clip(painter, clip)
+        painter.end()
+        self.paint_counters['clip_renders'] += 1
+    
+    def paintEvent(self, event):
+        """Paint the timeline from cached layers"""
+        started = perf_counter()
+        if self.background_layer is None:
+            self.render_background_layer()
+        if self.clip_layer is None:
+            self.render_clip_layer()
         
-        # Draw playhead
+        # Qt clips the painter to the update region, so a playhead move
+        # only copies the two strips it touched
+        rect = event.rect()
+        painter = QPainter(self)
+        painter.drawPixmap(rect, self.background_layer, self.scale_rect(rect))
+        painter.drawPixmap(rect, self.clip_layer, self.scale_rect(rect))
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         self.draw_playhead(painter)
+        painter.end()
         
-    def draw_time_markers(self, painter, fg_color):
-        """Draw time markers on timeline"""
-        marker_color = fg_color
-        marker_color.setAlpha(150)
-        painter.setPen(QPen(marker_color, 1))
-        
-        duration = self.get_total_duration()
-        if duration == 0:
-            duration = 60  # Default 1 minute
+        elapsed = (perf_counter() - started) * 1000
+        counters = self.paint_counters
+        counters['paints'] += 1
+        if rect != self.rect():
+            counters['partial_paints'] += 1
+        counters['total_ms'] += elapsed
+        counters['last_ms'] = elapsed
+    
+    def scale_rect(self, rect):
+        """Map a widget rectangle to layer pixels"""
+        ratio = self.devicePixelRatioF()
+        return QRect(int(rect.x() * ratio), int(rect.y() * ratio),
+                     int(rect.width() * ratio), int(rect.height() * ratio))
+    
+    def paint_stats(self):
+        """Get paint counters and timings for debugging"""
+        stats = dict(self.paint_counters)
+        stats['average_ms'] = stats['total_ms'] / stats['paints'] if stats['paints'] else 0.0
+        return stats
+    
+    def get_visible_range(self):
+        """Get the timeline seconds currently on screen"""
+        start = self.scroll_position / self.pixels_per_second
+        return start, start + self.width() / self.pixels_per_second
+    
+    def get_frame_rate(self):
+        """Frame rate used for frame ticks; the first clip's, else 30"""
+        for clip in self.clips:
+            if clip.info and clip.info.fps:
+                return clip.info.fps
+        return 30
+    
+    def get_tick_steps(self, fps):
+        """Pick (major, minor) tick spacing in seconds for the current zoom"""
+        steps = [frames / fps for frames in FRAME_STEPS if frames / fps < 1] + SECOND_STEPS
+        major = next((step for step in steps if step * self.pixels_per_second >= MIN_LABEL_SPACING), steps[-1])
         
-        # Draw major markers every 10 seconds
-        for i in range(0, int(duration) + 10, 10):
-            x = i * self.pixels_per_second - self.scroll_position
-            if x >= 0 and x <= self.width():
-                painter.drawLine(int(x), 0, int(x), self.height())
-                painter.setPen(QPen(fg_color, 1))
-                painter.drawText(int(x) + 5, 15, f"{i}s")
-                painter.setPen(QPen(marker_color, 1))
+        # Minor ticks must divide the major step so they line up, and only
+        # frame-level labels get frame-level ticks
+        for minor in (steps if major < 1 else SECOND_STEPS):
+            ratio = major / minor
+            if minor * self.pixels_per_second >= MIN_TICK_SPACING and abs(ratio - round(ratio)) < 1e-6:
+                return major, minor
+        return major, major
+    
+    def draw_time_markers(self, painter, theme):
+        """Draw the ruler over the visible range only"""
+        fps = self.get_frame_rate()
+        major, minor = self.get_tick_steps(fps)
+        per_major = int(round(major / minor))
+        show_frames = major < 1
         
-        # Draw minor markers every second
-        minor_color = fg_color
-        minor_color.setAlpha(100)
-        painter.setPen(QPen(minor_color, 1))
-        for i in range(0, int(duration) + 1):
-            x = i * self.pixels_per_second - self.scroll_position
-            if x >= 0 and x <= self.width():
-                painter.drawLine(int(x), 0, int(x), 20)
+        start, end = self.get_visible_range()
+        for tick in range(int(math.floor(start / minor)), int(math.ceil(end / minor)) + 1):
+            if tick < 0:
+                continue
+            seconds = tick * minor
+            x = int(round(seconds * self.pixels_per_second - self.scroll_position))
+            if tick % per_major:
+                painter.setPen(theme['minor_pen'])
+                painter.drawLine(x, 0, x, 20)
+            else:
+                painter.setPen(theme['major_pen'])
+                painter.drawLine(x, 0, x, self.height())
+                painter.setPen(theme['label_pen'])
+                painter.drawText(x + 5, 15, format_timecode(seconds, fps, show_frames))
     
     def draw_clip(self, painter, clip):
         """Draw a clip on timeline"""
@@ -176,37 +320,81 @@ class TimelineWidget(QWidget):
         # Clip rectangle
         clip_rect = QRect(int(x), 30, int(width), self.height() - 40)
         
-        # Get theme colors from application
-        from PyQt6.QtWidgets import QApplication
-        app = QApplication.instance()
-        theme_colors = None
-        if app:
-            theme_colors = app.property('theme_colors')
+        theme = self.get_theme()
+        brush = theme['selected_brush'] if clip == self.selected_clip else theme['clip_brush']
         
-        if theme_colors:
-            # Use theme colors
-            if clip == self.selected_clip:
-                color = theme_colors.get('timeline_selected', QColor(100, 150, 255))
-            else:
-                color = theme_colors.get('timeline_clip', QColor(60, 120, 200))
-            text_color = theme_colors.get('timeline_fg', QColor(255, 255, 255))
-        else:
-            # Fallback colors
-            if clip == self.selected_clip:
-                color = QColor(100, 150, 255)
-            else:
-                color = QColor(60, 120, 200)
-            text_color = QColor(255, 255, 255)
+        painter.fillRect(clip_rect, brush)
+        
+        # Filmstrip below the name; until it is generated the clip stays plain
+        strip = self.thumbnails.get(clip.filepath)
+        if strip is not None:
+            self.draw_filmstrip(painter, clip, clip_rect.adjusted(2, 20, -2, -2), strip)
+        
+        # Waveform below the filmstrip
+        pyramid = self.audio_peaks.get(clip.filepath)
+        if pyramid is not None:
+            wave_rect = clip_rect.adjusted(2, 22 + THUMB_HEIGHT, -2, -2)
+            self.draw_waveform(painter, clip, wave_rect, pyramid, theme['wave_pen'])
         
-        painter.fillRect(clip_rect, color)
-        painter.setPen(QPen(text_color, 2))
+        painter.setPen(theme['border_pen'])
         painter.drawRect(clip_rect)
         
         # Clip name
-        painter.setPen(QPen(text_color))
+        painter.setPen(theme['text_pen'])
         clip_name = clip.name[:20] + "..." if len(clip.name) > 20 else clip.name
         painter.drawText(clip_rect.adjusted(5, 5, -5, -5), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, clip_name)
     
+    def draw_filmstrip(self, painter, clip, rect, strip):
+        """Draw the keyframe thumbnails of the visible part of a clip"""
+        left = max(rect.left(), 0)
+        right = min(rect.right(), self.width())
+        if right <= left:
+            return
+        
+        clip_x = clip.start_time * self.pixels_per_second - self.scroll_position
+        start = clip.trim_start + (left - clip_x) / self.pixels_per_second
+        end = clip.trim_start + (right - clip_x) / self.pixels_per_second
+        
+        painter.save()
+        painter.setClipRect(rect)
+        for time, index in strip.get_thumbnails(self.pixels_per_second, start, end):
+            x = clip_x + (time - clip.trim_start) * self.pixels_per_second
+            painter.drawPixmap(int(x), rect.top(), strip.get_pixmap(index))
+        painter.restore()
+    
+    def draw_waveform(self, painter, clip, rect, pyramid, pen):
+        """Draw one min/max line per visible pixel column of a clip"""
+        left = max(rect.left(), 0)
+        right = min(rect.right(), self.width())
+        if right <= left or rect.height() < 8:
+            return
+        
+        clip_x = clip.start_time * self.pixels_per_second - self.scroll_position
+        start = clip.trim_start + (left - clip_x) / self.pixels_per_second
+        mins, maxs = pyramid.get_columns(start, self.pixels_per_second, right - left)
+        
+        half = rect.height() / 2
+        middle = rect.top() + half
+        tops = middle - np.clip(maxs * clip.volume * half, -half, half)
+        bottoms = middle - np.clip(mins * clip.volume * half, -half, half)
+        lines = [QLineF(left + i, top, left + i, bottom)
+                 for i, (top, bottom) in enumerate(zip(tops.tolist(), bottoms.tolist()))]
+        
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.setPen(pen)
+        painter.drawLines(lines)
+        painter.restore()
+    
+    def on_media_analyzed(self, filepath):
+        """Repaint once thumbnails or audio peaks of a file are ready"""
+        self.invalidate_layers(background=False)
+    
+    def get_playhead_rect(self):
+        """Get the strip the playhead covers"""
+        x = int(self.playhead_position * self.pixels_per_second - self.scroll_position)
+        return QRect(x - 6, 0, 13, self.height())
+    
     def draw_playhead(self, painter):
         """Draw playhead indicator"""
         x = self.playhead_position * self.pixels_per_second - self.scroll_position
@@ -214,17 +402,17 @@ class TimelineWidget(QWidget):
         if x < 0 or x > self.width():
             return
         
-        painter.setPen(QPen(QColor(255, 0, 0), 2))
+        theme = self.get_theme()
+        painter.setPen(theme['playhead_pen'])
         painter.drawLine(int(x), 0, int(x), self.height())
         
         # Draw triangle at top
-        from PyQt6.QtCore import QPoint
         triangle = [
             QPoint(int(x) - 5, 0),
             QPoint(int(x) + 5, 0),
             QPoint(int(x), 10)
         ]
-        painter.setBrush(QBrush(QColor(255, 0, 0)))
+        painter.setBrush(theme['playhead_brush'])
         painter.drawPolygon(triangle)
     
     def mousePressEvent(self, event):
@@ -235,28 +423,28 @@ class TimelineWidget(QWidget):
             time = x / self.pixels_per_second
             
             # Check if clicking on a clip
-            clicked_clip = None
-            for clip in self.clips:
-                clip_x = clip.start_time * self.pixels_per_second
-                clip_width = clip.duration * self.pixels_per_second
-                if clip_x <= x <= clip_x + clip_width:
-                    clicked_clip = clip
-                    break
+            hits = self.clip_index.at(time)
+            clicked_clip = hits[0] if hits else None
             
             if clicked_clip:
                 self.selected_clip = clicked_clip
                 self.clip_selected.emit(clicked_clip)
             else:
                 self.selected_clip = None
-                self.playhead_position = time
+                self.set_position(time)
                 self.position_changed.emit(time)
             
-            self.update()
+            self.invalidate_layers(background=False)  # Selection changed
     
     def wheelEvent(self, event):
         """Handle mouse wheel for scrolling"""
         delta = event.angleDelta().y()
         self.scroll_position += delta / 10
         self.scroll_position = max(0, self.scroll_position)
-        self.update()
+        self.invalidate_layers()
+    
+    def resizeEvent(self, event):
+        """Handle resize"""
+        super().resizeEvent(event)
+        self.invalidate_layers()
 
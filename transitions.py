@@ -28,9 +28,11 @@ def wipe_transition(clip1, clip2, direction='left', duration=1.0):
 
 def fade_in(clip, duration=1.0):
     """Fade in effect"""
-    return clip.fadein(duration)
+    from effect_graph import EffectGraph
+    return EffectGraph().fadein(duration).apply(clip)
 
 def fade_out(clip, duration=1.0):
     """Fade out effect"""
-    return clip.fadeout(duration)
+    from effect_graph import EffectGraph
+    return EffectGraph().fadeout(duration).apply(clip)
 
@@ -0,0 +1,76 @@
+"""
+Export Dialog
+Export options chosen before an interactive export starts
+"""
+
+from PyQt6.QtWidgets import (QDialog, QFormLayout, QComboBox, QCheckBox, QSpinBox,
+                             QDialogButtonBox, QLabel)
+from PyQt6.QtCore import QSettings
+from export_manager import QUALITIES
+import os
+
+class ExportDialog(QDialog):
+    """Quality, smart render and worker count for an export
+    
+    The choices are remembered between exports. One worker renders in a
+    single process with decoding, effects and encoding overlapped; more
+    split the timeline into segments rendered by that many processes.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = QSettings("VideoEditor", "Export")
+        self.setWindowTitle("Export Options")
+        self.init_ui()
+        self.load_settings()
+    
+    def init_ui(self):
+        """Initialize UI"""
+        layout = QFormLayout(self)
+        
+        self.quality_combo = QComboBox()
+        self.quality_combo.addItems(list(QUALITIES))
+        layout.addRow("Quality:", self.quality_combo)
+        
+        self.smart_render_check = QCheckBox("Stream-copy footage without effects")
+        layout.addRow("Smart render:", self.smart_render_check)
+        
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, os.cpu_count() or 1)
+        self.workers_spin.setToolTip("1 renders in this process; more render segments in parallel processes")
+        layout.addRow("Workers:", self.workers_spin)
+        
+        hint = QLabel("Parallel workers each open their own decoders and take longer to cancel.")
+        hint.setWordWrap(True)
+        layout.addRow(hint)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+    
+    def load_settings(self):
+        """Restore the options of the last export"""
+        quality = self.settings.value('quality', 'high')
+        self.quality_combo.setCurrentText(quality if quality in QUALITIES else 'high')
+        self.smart_render_check.setChecked(self.settings.value('smart_render', False, type=bool))
+        self.workers_spin.setValue(self.settings.value('workers', 1, type=int))
+    
+    def save_settings(self):
+        """Remember the options for the next export"""
+        self.settings.setValue('quality', self.quality_combo.currentText())
+        self.settings.setValue('smart_render', self.smart_render_check.isChecked())
+        self.settings.setValue('workers', self.workers_spin.value())
+    
+    def accept(self):
+        """Save the options and close"""
+        self.save_settings()
+        super().accept()
+    
+    def get_options(self):
+        """Keyword arguments for ExportManager.export"""
+        return {
+            'quality': self.quality_combo.currentText(),
+            'smart_render': self.smart_render_check.isChecked(),
+            'workers': self.workers_spin.value()
+        }
@@ -7,17 +7,26 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QListWidget, QListWidgetItem,
                              QLabel, QPushButton)
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QIcon
+from media_probe import probe
+from proxy_manager import get_proxy_manager, PENDING, READY, FAILED
 import os
 
 class MediaLibrary(QWidget):
     """Media library widget"""
     
     media_selected = pyqtSignal(str)
+    proxy_status_changed = pyqtSignal(str, str)  # Queued from proxy worker threads
+    
+    PROXY_LABELS = {PENDING: "building proxy...", READY: "proxy", FAILED: "proxy failed"}
     
     def __init__(self):
         super().__init__()
         self.media_files = []
+        self.proxies = get_proxy_manager()
         self.init_ui()
+        
+        self.proxy_status_changed.connect(self.on_proxy_status_changed)
+        self.proxies.add_listener(self.proxy_status_changed.emit)
     
     def init_ui(self):
         """Initialize UI"""
@@ -45,8 +54,40 @@ class MediaLibrary(QWidget):
             
             item = QListWidgetItem(os.path.basename(filepath))
             item.setData(Qt.ItemDataRole.UserRole, filepath)
-            item.setToolTip(filepath)
+            item.setToolTip(self.describe_media(filepath))
             self.media_list.addItem(item)
+            
+            # Transcodes in the background; on_proxy_status_changed updates the item
+            self.proxies.request(filepath)
+            self.update_proxy_status(item)
+    
+    def update_proxy_status(self, item):
+        """Show the proxy state of a media item in its label"""
+        filepath = item.data(Qt.ItemDataRole.UserRole)
+        name = os.path.basename(filepath)
+        label = self.PROXY_LABELS.get(self.proxies.get_status(filepath))
+        item.setText(f"{name}  [{label}]" if label else name)
+    
+    def on_proxy_status_changed(self, filepath, status):
+        """Handle a proxy finishing or failing"""
+        for row in range(self.media_list.count()):
+            item = self.media_list.item(row)
+            if item.data(Qt.ItemDataRole.UserRole) == filepath:
+                self.update_proxy_status(item)
+    
+    def describe_media(self, filepath):
+        """Build the tooltip for a media file from its probed metadata"""
+        try:
+            info = probe(filepath)
+        except Exception as e:
+            return f"{filepath}\nCould not read media: {e}"
+        
+        minutes, seconds = divmod(info.duration, 60)
+        lines = [filepath, f"{int(minutes)}:{seconds:05.2f}  {info.width}x{info.height}  {info.fps:.2f} fps"]
+        if info.video_codec:
+            lines.append(f"Video: {info.video_codec}")
+        lines.append(f"Audio: {info.audio_codec or 'yes'}" if info.has_audio else "Audio: none")
+        return "\n".join(lines)
     
     def on_item_double_clicked(self, item):
         """Handle double click on media item"""
@@ -0,0 +1,146 @@
+"""
+Render Queue Panel
+Lists batch export jobs and controls the render queue
+"""
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
+                             QFileDialog, QInputDialog, QMessageBox)
+from PyQt6.QtCore import Qt, pyqtSignal
+from render_queue import get_render_queue
+from export_manager import QUALITIES
+import os
+
+class RenderQueuePanel(QWidget):
+    """Render queue widget"""
+    
+    job_changed = pyqtSignal(object)  # Queued from the scheduler thread
+    
+    COLUMNS = ("Project", "Output", "Quality", "Priority", "Status")
+    
+    def __init__(self, render_queue=None):
+        super().__init__()
+        self.queue = render_queue or get_render_queue()
+        self.init_ui()
+        
+        self.job_changed.connect(self.on_job_changed)
+        self.queue.add_listener(self.job_changed.emit)
+        self.refresh()
+        self.queue.start()  # Picks up jobs left from the last session
+    
+    def init_ui(self):
+        """Initialize UI"""
+        layout = QVBoxLayout(self)
+        
+        # Header
+        header = QLabel("Render Queue")
+        header.setStyleSheet("font-weight: bold; font-size: 14px;")
+        layout.addWidget(header)
+        
+        # Job list
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        # Controls
+        buttons = QHBoxLayout()
+        add_btn = QPushButton("+ Add Job")
+        add_btn.clicked.connect(self.on_add_job)
+        buttons.addWidget(add_btn)
+        
+        for text, handler in (("▲", self.on_raise_priority), ("▼", self.on_lower_priority),
+                              ("Cancel", self.on_cancel), ("Retry", self.on_retry), ("Remove", self.on_remove)):
+            button = QPushButton(text)
+            button.clicked.connect(handler)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+    
+    def refresh(self):
+        """Rebuild the job list in run order"""
+        selected = self.get_selected_id()
+        jobs = self.queue.get_jobs()
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            values = (os.path.basename(job.project_path), os.path.basename(job.output_path),
+                      job.quality + (f" ({job.preset})" if job.preset else ""), str(job.priority), job.describe())
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setData(Qt.ItemDataRole.UserRole, job.id)
+                item.setToolTip(f"{job.project_path}\n{job.output_path}\n{job.describe()}")
+                self.table.setItem(row, column, item)
+            if job.id == selected:
+                self.table.selectRow(row)
+    
+    def on_job_changed(self, job):
+        """Update a job's status, or the whole list when jobs were added or removed"""
+        if self.queue.get_job(job.id):
+            for row in range(self.table.rowCount()):
+                if self.table.item(row, 0).data(Qt.ItemDataRole.UserRole) == job.id:
+                    self.table.item(row, 4).setText(job.describe())
+                    return
+        self.refresh()
+    
+    def get_selected_id(self):
+        """Id of the selected job"""
+        items = self.table.selectedItems()
+        return items[0].data(Qt.ItemDataRole.UserRole) if items else None
+    
+    def on_add_job(self):
+        """Queue an export of a saved project"""
+        project, _ = QFileDialog.getOpenFileName(
+            self, "Add Render Job", "", "Video Editor Projects (*.vep)"
+        )
+        if not project:
+            return
+        output, _ = QFileDialog.getSaveFileName(
+            self, "Render To", os.path.splitext(project)[0] + '.mp4',
+            "MP4 Files (*.mp4);;AVI Files (*.avi);;MOV Files (*.mov)"
+        )
+        if not output:
+            return
+        quality, ok = QInputDialog.getItem(self, "Render Quality", "Quality:", list(QUALITIES),
+                                           QUALITIES.index('high'), False)
+        if not ok:
+            return
+        try:
+            self.queue.add_job(project, output, quality)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to add render job:\n{str(e)}")
+    
+    def on_raise_priority(self):
+        """Run the selected job sooner"""
+        self.change_priority(1)
+    
+    def on_lower_priority(self):
+        """Run the selected job later"""
+        self.change_priority(-1)
+    
+    def change_priority(self, step):
+        """Move the selected job's priority by step"""
+        job = self.queue.get_job(self.get_selected_id())
+        if job:
+            self.queue.set_priority(job.id, job.priority + step)
+            self.refresh()
+    
+    def on_cancel(self):
+        """Cancel the selected job"""
+        job_id = self.get_selected_id()
+        if job_id:
+            self.queue.cancel(job_id)
+    
+    def on_retry(self):
+        """Queue the selected job again"""
+        job_id = self.get_selected_id()
+        if job_id:
+            self.queue.retry(job_id)
+    
+    def on_remove(self):
+        """Remove the selected job unless it is running"""
+        job_id = self.get_selected_id()
+        if job_id:
+            self.queue.remove(job_id)
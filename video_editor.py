@@ -13,9 +13,14 @@ from timeline import TimelineWidget
 from preview import PreviewWidget
 from project_manager import ProjectManager
 from export_manager import ExportManager
+from export_worker import ExportWorker
+from proxy_manager import get_proxy_manager
+from playback_clock import PlaybackClock
 from ui.properties_panel import PropertiesPanel
 from ui.media_library import MediaLibrary
 from ui.theme_selector import ThemeSelector
+from ui.render_queue_panel import RenderQueuePanel
+from ui.export_dialog import ExportDialog
 from themes import ThemeManager
 
 class VideoEditor(QMainWindow):
@@ -25,12 +30,14 @@ class VideoEditor(QMainWindow):
         super().__init__()
         self.project_manager = ProjectManager()
         self.export_manager = ExportManager()
+        self.export_worker = None  # Running background export
         self.theme_manager = ThemeManager()
         self.current_project = None
         self.clips = []  # List of video clips on timeline
         self.selected_clip = None
         self.playback_position = 0
         self.is_playing = False
+        self.playback_clock = PlaybackClock()
         
         self.init_ui()
         self.setup_shortcuts()
@@ -95,6 +102,10 @@ class VideoEditor(QMainWindow):
         
         right_layout.addStretch()
         
+        # Batch exports of saved projects
+        self.render_queue_panel = RenderQueuePanel()
+        right_layout.addWidget(self.render_queue_panel)
+        
         # Add panels to splitter
         main_splitter.addWidget(left_panel)
         main_splitter.addWidget(center_panel)
@@ -110,6 +121,7 @@ class VideoEditor(QMainWindow):
         
         # Playback timer
         self.playback_timer = QTimer()
+        self.playback_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.playback_timer.timeout.connect(self.update_playback)
         
     def create_toolbar(self):
@@ -168,10 +180,15 @@ class VideoEditor(QMainWindow):
         toolbar.addSeparator()
         
         # Export
-        export_action = QAction("Export Video", self)
-        export_action.setShortcut("Ctrl+E")
-        export_action.triggered.connect(self.export_video)
-        toolbar.addAction(export_action)
+        self.export_action = QAction("Export Video", self)
+        self.export_action.setShortcut("Ctrl+E")
+        self.export_action.triggered.connect(self.export_video)
+        toolbar.addAction(self.export_action)
+        
+        self.cancel_export_action = QAction("Cancel Export", self)
+        self.cancel_export_action.setEnabled(False)
+        self.cancel_export_action.triggered.connect(self.cancel_export)
+        toolbar.addAction(self.cancel_export_action)
         
     def setup_shortcuts(self):
         """Setup keyboard shortcuts"""
@@ -198,7 +215,7 @@ class VideoEditor(QMainWindow):
                 return
         
         self.current_project = self.project_manager.create_new()
-        self.clips = []
+        self.close_clips()
         self.timeline.clear()
         self.preview.clear()
         self.statusBar().showMessage("New project created")
@@ -264,6 +281,7 @@ class VideoEditor(QMainWindow):
     def on_timeline_position_changed(self, position):
         """Handle timeline position change"""
         self.playback_position = position
+        self.playback_clock.seek(position)
         self.preview.set_position(position)
     
     def on_properties_changed(self, properties):
@@ -283,29 +301,42 @@ class VideoEditor(QMainWindow):
     def start_playback(self):
         """Start playback"""
         self.is_playing = True
-        self.playback_timer.start(33)  # ~30 FPS
+        self.playback_clock.set_fps(self.timeline.get_frame_rate())
+        self.playback_clock.reset_stats()
+        self.playback_clock.start(self.playback_position)
+        self.playback_timer.start(self.playback_clock.get_timer_interval())
         self.statusBar().showMessage("Playing...")
     
     def pause_playback(self):
         """Pause playback"""
         self.is_playing = False
         self.playback_timer.stop()
-        self.statusBar().showMessage("Paused")
+        self.playback_clock.pause()
+        stats = self.playback_clock.stats
+        self.statusBar().showMessage(
+            f"Paused ({stats['presented']} frames shown, {stats['dropped']} dropped, {stats['late']} late)"
+        )
     
     def stop_playback(self):
         """Stop playback"""
         self.pause_playback()
         self.playback_position = 0
+        self.playback_clock.seek(0)
         self.timeline.set_position(0)
         self.preview.set_position(0)
     
     def update_playback(self):
-        """Update playback position"""
-        duration = self.timeline.get_total_duration()
-        if self.playback_position < duration:
-            self.playback_position += 0.033  # ~30 FPS
-            self.timeline.set_position(self.playback_position)
-            self.preview.set_position(self.playback_position)
+        """Update playback position from the playback clock"""
+        frame = self.playback_clock.next_frame()
+        if frame is None:
+            return  # Current frame is still due
+        
+        position = self.playback_clock.get_frame_time(frame)
+        if position < self.timeline.get_total_duration():
+            self.playback_position = position
+            self.timeline.set_position(position)
+            self.preview.set_position(position)
+            self.playback_clock.frame_presented(frame)
         else:
             self.stop_playback()
     
@@ -324,6 +355,7 @@ class VideoEditor(QMainWindow):
         if self.selected_clip:
             self.clips.remove(self.selected_clip)
             self.timeline.remove_clip(self.selected_clip)
+            self.selected_clip.close()
             self.selected_clip = None
             self.properties_panel.clear()
             self.statusBar().showMessage("Clip deleted")
@@ -348,23 +380,84 @@ class VideoEditor(QMainWindow):
             self, "Export Video", "", "MP4 Files (*.mp4);;AVI Files (*.avi);;MOV Files (*.mov)"
         )
         if filename:
-            try:
-                self.statusBar().showMessage("Exporting video...")
-                self.export_manager.export(self.clips, filename, self.on_export_progress)
-                self.statusBar().showMessage(f"Video exported: {os.path.basename(filename)}")
-                QMessageBox.information(self, "Success", "Video exported successfully!")
-            except Exception as e:
-                QMessageBox.critical(self, "Export Error", f"Failed to export video:\n{str(e)}")
-                self.statusBar().showMessage("Export failed")
+            dialog = ExportDialog(self)
+            if dialog.exec() != ExportDialog.DialogCode.Accepted:
+                return
+            
+            # The worker exports a copy of the clips, so editing can go on
+            from app_paths import get_cache_dir
+            self.export_worker = ExportWorker(
+                self.export_manager, self.clips, filename,
+                progress_log=os.path.join(get_cache_dir('logs'), 'export.jsonl'), **dialog.get_options())
+            self.export_worker.progress_changed.connect(self.on_export_progress)
+            self.export_worker.export_finished.connect(
+                lambda progress: self.on_export_finished(filename, progress))
+            self.export_worker.export_failed.connect(self.on_export_failed)
+            self.export_worker.export_cancelled.connect(self.on_export_cancelled)
+            self.export_worker.finished.connect(self.on_export_worker_done)
+            
+            self.export_action.setEnabled(False)
+            self.cancel_export_action.setEnabled(True)
+            self.statusBar().showMessage("Exporting video...")
+            self.export_worker.start()
+    
+    def cancel_export(self):
+        """Stop the running export"""
+        if self.export_worker and self.export_worker.isRunning():
+            self.export_worker.cancel()
+            self.cancel_export_action.setEnabled(False)
+            self.statusBar().showMessage("Cancelling export...")
+    
+    def on_export_finished(self, filename, progress):
+        """Report a completed export"""
+        self.statusBar().showMessage(
+            f"Video exported: {os.path.basename(filename)} in {progress.elapsed:.1f}s "
+            f"({progress.fps:.1f} fps) {progress.describe_stages()}")
+        QMessageBox.information(self, "Success", "Video exported successfully!")
+    
+    def on_export_failed(self, message):
+        """Report a failed export"""
+        QMessageBox.critical(self, "Export Error", f"Failed to export video:\n{message}")
+        self.statusBar().showMessage("Export failed")
+    
+    def on_export_cancelled(self):
+        """Report a cancelled export"""
+        self.statusBar().showMessage("Export cancelled")
+    
+    def on_export_worker_done(self):
+        """Re-enable exporting once the worker thread has stopped"""
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self.export_action.setEnabled(True)
+        self.cancel_export_action.setEnabled(False)
     
     def on_export_progress(self, progress):
         """Handle export progress updates"""
-        self.statusBar().showMessage(f"Exporting... {progress}%")
+        self.statusBar().showMessage(f"Exporting... {progress.describe()}")
     
     def load_project_data(self):
         """Load project data into UI"""
-        # TODO: Implement project loading
-        pass
+        from clip import VideoClip
+        data = self.current_project or {}
+        
+        self.close_clips()
+        self.selected_clip = None
+        self.timeline.clear()
+        self.preview.clear()
+        self.properties_panel.clear()
+        
+        # Clips only probe their media here; decoders open on first use
+        for clip_data in data.get('clips', []):
+            clip = VideoClip.from_dict(clip_data)
+            self.clips.append(clip)
+            self.timeline.add_clip(clip)
+            self.media_library.add_media(clip.filepath)
+    
+    def close_clips(self):
+        """Release every clip on the timeline"""
+        for clip in self.clips:
+            clip.close()
+        self.clips = []
     
     def has_unsaved_changes(self):
         """Check if there are unsaved changes"""
@@ -393,6 +486,7 @@ class VideoEditor(QMainWindow):
             f"background-color: {theme_colors['timeline_bg'].name()};"
             f"color: {theme_colors['timeline_fg'].name()};"
         )
+        self.timeline.refresh_theme()
         
         # Preview styling
         self.preview.setStyleSheet(
@@ -421,5 +515,13 @@ class VideoEditor(QMainWindow):
             if reply == QMessageBox.StandardButton.No:
                 event.ignore()
                 return
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        self.preview.clear()
+        self.timeline.thumbnails.stop()
+        self.timeline.audio_peaks.stop()
+        get_proxy_manager().shutdown()
+        self.render_queue_panel.queue.shutdown()  # Unfinished jobs resume next time
         event.accept()
 